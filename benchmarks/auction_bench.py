@@ -0,0 +1,446 @@
+"""
+Load-test harness for ServerAuctions.
+
+Drives the real `bid`, `close_auction` and scheduler code against stand-in
+guilds, threads, messages and members, an in-memory Config and a fake bank,
+then reports throughput, latency percentiles, I/O per bid and anomalies.
+
+Run from the repository root (needs Red installed):
+
+    python -m benchmarks.auction_bench --auctions 200 --bidders 2000 --bids 20000
+"""
+
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+from copy import deepcopy
+from pathlib import Path
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import discord
+
+from serverauctions import auction as auction_module
+from serverauctions import escrow as escrow_module
+from serverauctions.auction import ServerAuctions
+
+STARTING_BALANCE = 10 ** 9
+
+counts = Counter()
+io_latency = 0.0
+
+async def io():
+    # Every fake network or disk call yields, so concurrent bids really interleave.
+    await asyncio.sleep(io_latency * random.uniform(0.5, 1.5))
+
+# ---------------------------------------------------------------- Config
+
+class FakeValue:
+    def __init__(self, scope: dict, name: str):
+        self.scope = scope
+        self.name = name
+
+    async def __call__(self):
+        return deepcopy(self.scope[self.name])
+
+    async def get_raw(self, *keys, default=None):
+        node = self.scope[self.name]
+        for key in keys:
+            if key not in node:
+                return default
+            node = node[key]
+        return deepcopy(node)
+
+    async def set(self, value):
+        counts["config_writes"] += 1
+        await io()
+        self.scope[self.name] = deepcopy(value)
+
+    async def clear(self):
+        counts["config_writes"] += 1
+        await io()
+        self.scope[self.name] = deepcopy(FakeConfig.defaults[self.name])
+
+    async def set_raw(self, *keys, value):
+        counts["config_writes"] += 1
+        await io()
+        node = self.scope[self.name]
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = deepcopy(value)
+
+    async def clear_raw(self, *keys):
+        counts["config_writes"] += 1
+        await io()
+        node = self.scope[self.name]
+        for key in keys[:-1]:
+            node = node.get(key, {})
+        node.pop(keys[-1], None)
+
+class FakeScope:
+    def __init__(self, data: dict):
+        self._data = data
+
+    def __getattr__(self, name):
+        return FakeValue(self._data, name)
+
+class FakeConfig:
+    defaults = {}
+
+    def __init__(self):
+        self.guilds = {}
+        self.globals = {}
+        self.members = defaultdict(lambda: {"auctioneer": False})
+
+    def __getattr__(self, name):
+        return FakeValue(self.globals, name)
+
+    @classmethod
+    def get_conf(cls, cog, identifier):
+        return cls()
+
+    def register_guild(self, **defaults):
+        FakeConfig.defaults.update(defaults)
+
+    def register_member(self, **defaults):
+        pass
+
+    def register_global(self, **defaults):
+        self.globals.update(defaults)
+
+    def guild_from_id(self, guild_id: int) -> FakeScope:
+        if guild_id not in self.guilds:
+            self.guilds[guild_id] = deepcopy(FakeConfig.defaults)
+        return FakeScope(self.guilds[guild_id])
+
+    def guild(self, guild) -> FakeScope:
+        return self.guild_from_id(guild.id)
+
+    def member(self, member) -> FakeScope:
+        return FakeScope(self.members[(member.guild.id, member.id)])
+
+    async def all_guilds(self):
+        return deepcopy(self.guilds)
+
+# ---------------------------------------------------------------- Bank
+
+class FakeBank:
+    def __init__(self):
+        self.balances = defaultdict(lambda: STARTING_BALANCE)
+
+    async def get_balance(self, member):
+        await io()
+        return self.balances[member.id]
+
+    async def withdraw_credits(self, member, amount):
+        counts["bank_writes"] += 1
+        await io()
+        if amount > self.balances[member.id]:
+            raise ValueError("Not enough funds.")
+        self.balances[member.id] -= amount
+
+    async def deposit_credits(self, member, amount):
+        counts["bank_writes"] += 1
+        await io()
+        self.balances[member.id] += amount
+
+# ---------------------------------------------------------------- Discord
+
+class FakeMember:
+    def __init__(self, member_id: int, guild: "FakeGuild"):
+        self.id = member_id
+        self.guild = guild
+        self.bot = False
+        self.display_name = f"user{member_id}"
+
+    async def send(self, content):
+        counts["dms"] += 1
+        await io()
+
+class FakeMessage:
+    def __init__(self, message_id: int, channel: "FakeThread", embed: discord.Embed = None):
+        self.id = message_id
+        self.channel = channel
+        self.guild = channel.guild
+        self.embeds = [embed] if embed else []
+        self.jump_url = f"https://discord.com/channels/{self.guild.id}/{channel.id}/{message_id}"
+
+    async def edit(self, **kwargs):
+        counts["message_edits"] += 1
+        await io()
+        if "embed" in kwargs:
+            self.embeds = [kwargs["embed"]] if kwargs["embed"] else []
+
+class FakeThread:
+    def __init__(self, thread_id: int, guild: "FakeGuild"):
+        self.id = thread_id
+        self.guild = guild
+        self.messages = {}
+
+    async def send(self, content=None, **kwargs):
+        counts["channel_sends"] += 1
+
+    async def edit(self, **kwargs):
+        pass
+
+    def get_partial_message(self, message_id: int):
+        return self.messages[message_id]
+
+    async def fetch_message(self, message_id: int):
+        counts["message_fetches"] += 1
+        await io()
+        try:
+            return self.messages[message_id]
+        except KeyError:
+            raise discord.NotFound(type("Response", (), {"status": 404, "reason": "Not Found"})(), "Unknown Message")
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.name = f"guild{guild_id}"
+        self.members = {}
+        self.channels = {}
+
+    def get_member(self, member_id: int):
+        return self.members.get(member_id)
+
+    async def fetch_member(self, member_id: int):
+        return self.members[member_id]
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    def get_channel_or_thread(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    async def fetch_channel(self, channel_id: int):
+        return self.channels[channel_id]
+
+class FakeContext:
+    def __init__(self, author: FakeMember, channel: FakeThread):
+        self.author = author
+        self.guild = author.guild
+        self.channel = channel
+        self.replies = []
+
+    async def send(self, content=None, **kwargs):
+        self.replies.append(content)
+
+class FakeBot:
+    def __init__(self, guilds):
+        self.loop = asyncio.get_running_loop()
+        self.guilds = guilds
+        self._guilds = {guild.id: guild for guild in guilds}
+
+    async def wait_until_ready(self):
+        return
+
+    def get_guild(self, guild_id: int):
+        return self._guilds.get(guild_id)
+
+    def get_cog(self, name: str):
+        return None
+
+# ---------------------------------------------------------------- Harness
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+async def run(args):
+    global io_latency
+    random.seed(args.seed)
+    io_latency = args.io_latency
+    auction_module.Config = FakeConfig
+    fake_bank = FakeBank()
+    auction_module.bank = fake_bank
+    escrow_module.bank = fake_bank
+    auction_module.EMBED_EDIT_INTERVAL = args.edit_interval
+    data_dir = Path(tempfile.mkdtemp(prefix="auction_bench_"))
+    auction_module.cog_data_path = lambda *_, **__: data_dir
+
+    guilds = [FakeGuild(guild_id) for guild_id in range(1, args.guilds + 1)]
+    bot = FakeBot(guilds)
+    cog = ServerAuctions(bot)
+    if args.backend == "sqlite":
+        await cog.config.backend.set("sqlite")
+    cog.notifier.interval = 0
+    cog.notifier.merge_window = args.edit_interval
+    await cog.cog_load()
+    for guild in guilds:
+        await cog.config.guild(guild).use_bank.set(True)
+    await cog.init_task
+
+    now = int(datetime.now(timezone.utc).timestamp())
+    auctions = []
+    next_id = 10 ** 6
+    for i in range(args.auctions):
+        guild = guilds[i % len(guilds)]
+        next_id += 2
+        thread = FakeThread(next_id, guild)
+        guild.channels[thread.id] = thread
+        host = FakeMember(next_id + 1, guild)
+        guild.members[host.id] = host
+        end_timestamp = now + 3600
+        message = FakeMessage(next_id + 1, thread)
+        thread.messages[message.id] = message
+        auction_data = {
+            "thread_id": thread.id,
+            "message_id": message.id,
+            "host_id": host.id,
+            "auction_id": i // len(guilds) + 1,
+            "name": f"item {i}",
+            "description": "benchmark",
+            "host_name": host.display_name,
+            "quick_sold": None,
+            "current_bid": None,
+            "current_bidder": None,
+            "held": 0,
+            "end_timestamp": end_timestamp,
+            "min_bid": 1,
+            "bid_count": 0,
+            "created_at": now,
+        }
+        await cog.store.save(guild.id, auction_data)
+        cog.schedule_auction_end(guild.id, auction_data)
+        auctions.append((guild, thread, auction_data["auction_id"], host))
+
+    bidders = []
+    for i in range(args.bidders):
+        guild = guilds[i % len(guilds)]
+        member = FakeMember(10 ** 9 + i, guild)
+        guild.members[member.id] = member
+        bidders.append(member)
+    bidders_by_guild = defaultdict(list)
+    for member in bidders:
+        bidders_by_guild[member.guild.id].append(member)
+
+    counts.clear()
+    accepted = defaultdict(list)
+    outcomes = Counter()
+    latencies = []
+
+    async def place_bid():
+        guild, thread, auction_id, _ = random.choice(auctions)
+        member = random.choice(bidders_by_guild[guild.id])
+        record = cog.store.get(guild.id, auction_id)
+        current = record["current_bid"] if record and record["current_bid"] else 0
+        amount = current + random.randint(1, 10)
+        ctx = FakeContext(member, thread)
+        started = time.perf_counter()
+        await cog.bid.callback(cog, ctx, amount)
+        latencies.append(time.perf_counter() - started)
+        reply = ctx.replies[0] if ctx.replies else ""
+        if reply.startswith("Your bid of"):
+            outcomes["accepted"] += 1
+            accepted[(guild.id, auction_id)].append((amount, member.id))
+        elif reply.startswith("Can't do that"):
+            outcomes["outbid_before_accept"] += 1
+        else:
+            outcomes["other"] += 1
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def worker():
+        async with semaphore:
+            await place_bid()
+
+    bid_started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.bids)))
+    bid_elapsed = time.perf_counter() - bid_started
+    bid_counts = counts.copy()
+
+    # Let pending debounced embed edits and merged DMs flush before counting them.
+    await asyncio.sleep(args.edit_interval + 0.1)
+    await cog.notifier.queue.join()
+    bid_counts["message_edits"] = counts["message_edits"]
+    bid_counts["dms"] = counts["dms"]
+
+    anomalies = []
+    for (guild_id, auction_id), bids in accepted.items():
+        record = cog.store.get(guild_id, auction_id)
+        best_amount, best_bidder = max(bids)
+        if record["current_bid"] != best_amount or record["current_bidder"] != best_bidder:
+            anomalies.append(f"lost bid on {guild_id}/#{auction_id}: stored {record['current_bid']}, best accepted {best_amount}")
+        if record["held"] != best_amount:
+            anomalies.append(f"held credits mismatch on {guild_id}/#{auction_id}: {record['held']} != {best_amount}")
+
+    # Close half directly, hand the other half to the scheduler.
+    bank_writes_before_close = counts["bank_writes"]
+    close_started = time.perf_counter()
+    half = len(auctions) // 2
+    for guild, thread, auction_id, _ in auctions[:half]:
+        message = await cog.fetch_auction_message(guild, auction_id)
+        await cog.close_auction(message, auction_id)
+    close_elapsed = time.perf_counter() - close_started
+
+    schedule_started = time.perf_counter()
+    due = datetime.now(timezone.utc).timestamp()
+    for guild, _, auction_id, _ in auctions[half:]:
+        await cog.store.save(guild.id, dict(cog.store.get(guild.id, auction_id), end_timestamp=due))
+        cog.scheduler.schedule((guild.id, auction_id), due)
+    while (cog.store.records or cog.scheduler.firing) and time.perf_counter() - schedule_started < 60:
+        await asyncio.sleep(0.01)
+    schedule_elapsed = time.perf_counter() - schedule_started
+    if cog.store.records:
+        anomalies.append(f"{len(cog.store.records)} auctions were never closed by the scheduler")
+    close_bank_writes = counts["bank_writes"] - bank_writes_before_close
+
+    # Every credit must end up with its owner: bidders lose exactly what they won, hosts gain it.
+    expected = defaultdict(int)
+    for (guild_id, auction_id), bids in accepted.items():
+        best_amount, best_bidder = max(bids)
+        host_id = next(host.id for guild, _, a_id, host in auctions if guild.id == guild_id and a_id == auction_id)
+        expected[best_bidder] -= best_amount
+        expected[host_id] += best_amount
+    for member_id, balance in fake_bank.balances.items():
+        if balance - STARTING_BALANCE != expected[member_id]:
+            anomalies.append(f"balance drift for {member_id}: {balance - STARTING_BALANCE} != {expected[member_id]}")
+
+    await asyncio.sleep(args.edit_interval + 0.1)
+    cog.cog_unload()
+
+    total = max(args.bids, 1)
+    print(f"backend={args.backend} auctions={args.auctions} guilds={args.guilds} bidders={args.bidders} bids={args.bids} concurrency={args.concurrency}")
+    print(f"bid outcomes: {dict(outcomes)}")
+    print(f"bid throughput: {args.bids / bid_elapsed:,.0f} bids/s ({bid_elapsed:.2f}s)")
+    print(
+        "bid latency ms: "
+        f"p50={percentile(latencies, 50) * 1000:.2f} p90={percentile(latencies, 90) * 1000:.2f} "
+        f"p99={percentile(latencies, 99) * 1000:.2f} max={max(latencies, default=0) * 1000:.2f} "
+        f"mean={statistics.fmean(latencies) * 1000 if latencies else 0:.2f}"
+    )
+    print(
+        f"per bid: config_writes={bid_counts['config_writes'] / total:.3f} "
+        f"message_edits={bid_counts['message_edits'] / total:.3f} "
+        f"bank_writes={bid_counts['bank_writes'] / total:.3f} "
+        f"message_fetches={bid_counts['message_fetches'] / total:.3f} dms={bid_counts['dms'] / total:.3f}"
+    )
+    print(f"close_auction: {half} auctions in {close_elapsed:.2f}s")
+    print(f"per close: bank_writes={close_bank_writes / max(len(auctions), 1):.3f}")
+    print(f"scheduler: {len(auctions) - half} auctions in {schedule_elapsed:.2f}s")
+    print(f"anomalies: {len(anomalies)}")
+    for anomaly in anomalies[:20]:
+        print(f"  {anomaly}")
+    return 1 if anomalies else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--auctions", type=int, default=100)
+    parser.add_argument("--bidders", type=int, default=1000)
+    parser.add_argument("--bids", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--edit-interval", type=float, default=0.2)
+    parser.add_argument("--io-latency", type=float, default=0.001, help="mean seconds per fake Config/bank/Discord call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=("config", "sqlite"), default="config")
+    raise SystemExit(asyncio.run(run(parser.parse_args())))
+
+if __name__ == "__main__":
+    main()
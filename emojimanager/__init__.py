@@ -1,6 +1,6 @@
 from .emojimanager import EmojiManager
 
-__red_end_user_data_statement__ = "This cog does not store any user data."
+__red_end_user_data_statement__ = "This cog stores how often a user uses each custom emoji if a server enables per-user emoji stats."
 
 async def setup(bot):
     await bot.add_cog(EmojiManager(bot))
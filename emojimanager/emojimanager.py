@@ -1,26 +1,90 @@
 
 
 import re
+import asyncio
+import logging
 import aiohttp
 import discord 
 from redbot.core import commands, Config
 from redbot.core.utils.chat_formatting import pagify
 from redbot.core.utils.views import SimpleMenu
 
+from typing import Dict, Literal, Set, Tuple
 from typing_extensions import Optional
 
+from .usage import UsageTable
+
+# Same pattern as NcogsCore's preprocessor: the whole match is the emoji string, the group its id.
+CUSTOM_EMOJI_RE = re.compile(r"<a?:\w+:(\d+)>")
+
+log = logging.getLogger('red.ncogs.emojimanager')
+
+EMOJI_FLUSH_INTERVAL = 60
+DIMENSIONS = ("channel", "user")
+
+class EmojiStatsFlags(commands.FlagConverter, prefix="--", delimiter=" "):
+    channel: Optional[discord.abc.GuildChannel] = None
+    user: Optional[discord.Member] = None
+
 class EmojiManager(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.config = Config.get_conf(self, identifier = 7543971538)
         self.config.register_guild(
             enabled = False,
-            emoji_usage ={ }
+            emoji_usage ={ },
+            track_channel = False,
+            track_user = False,
+            channel_usage = {},
+            user_usage = {},
         )
+        # Per-channel and per-user counts, updated in memory and written to Config in batches.
+        self.usage: Dict[Tuple[int, str], UsageTable] = {}
+        self.dirty: Set[Tuple[int, str]] = set()
+        self.flush_task = None
+
+    async def red_delete_data_for_user(self, *, requester, user_id: int):
+        for guild_id in await self.config.all_guilds():
+            table = await self.get_usage_table(guild_id, "user")
+            if user_id in table.by_dim:
+                self.usage[(guild_id, "user")] = table.retain(lambda dim_id, _: dim_id != user_id)
+                self.dirty.add((guild_id, "user"))
+        await self.flush_usage()
+
+    async def cog_load(self):
+        self.flush_task = asyncio.create_task(self.flush_loop())
 
-    async def red_delete_data_for_user(self, **kwargs):
-        """Nothing to delete"""
-        return
+    async def cog_unload(self):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        await self.flush_usage()
+
+    async def get_usage_table(self, guild_id: int, dimension: str) -> UsageTable:
+        key = (guild_id, dimension)
+        table = self.usage.get(key)
+        if table is None:
+            data = await self.config.guild_from_id(guild_id).get_attr(f"{dimension}_usage")()
+            # Another message may have loaded the table while Config was read.
+            table = self.usage.setdefault(key, UsageTable.from_config(data))
+        return table
+
+    async def flush_usage(self):
+        for key in list(self.dirty):
+            self.dirty.discard(key)
+            table = self.usage.get(key)
+            if table is None:
+                continue
+            guild_id, dimension = key
+            try:
+                await self.config.guild_from_id(guild_id).get_attr(f"{dimension}_usage").set(table.to_config())
+            except Exception:
+                self.dirty.add(key)
+                log.exception(f"Failed to save {dimension} emoji usage for guild {guild_id}.")
+
+    async def flush_loop(self):
+        while True:
+            await asyncio.sleep(EMOJI_FLUSH_INTERVAL)
+            await self.flush_usage()
 
     @commands.group()
     @commands.bot_has_permissions(manage_emojis = True)
@@ -98,9 +162,37 @@ class EmojiManager(commands.Cog):
         await ctx.send(emoji.url)
     
     @commands.command()
-    async def emojistats(self, ctx: commands.Context):
-        "Display Emoji usage."
+    async def emojistats(self, ctx: commands.Context, *, flags: EmojiStatsFlags):
+        """
+        Display Emoji usage.
+
+        Use `--channel <channel>` or `--user <member>` to see usage in one channel or by one member.
+        These need per-channel or per-user tracking enabled with `[p]emojistatstrack`.
+        """
+        if flags.channel and flags.user:
+            await ctx.send("Use either `--channel` or `--user`, not both.")
+            return
         emoji_usage = await self.config.guild(ctx.guild).emoji_usage()
+
+        if flags.channel or flags.user:
+            dimension, target = ("channel", flags.channel) if flags.channel else ("user", flags.user)
+            table = await self.get_usage_table(ctx.guild.id, dimension)
+            usage = table.usage(target.id)
+            if not usage:
+                if not await self.config.guild(ctx.guild).get_attr(f"track_{dimension}")():
+                    await ctx.send(f"Per-{dimension} emoji stats are not tracked. Use `{ctx.clean_prefix}emojistatstrack {dimension}`.")
+                else:
+                    await ctx.send(f"No emoji stats recorded for **{target}** yet.")
+                return
+            # Emojis in the per-dimension tables are stored by id; the totals keep their full strings.
+            names = {emoji_id(emoji_str): emoji_str for emoji_str in emoji_usage}
+            stats_message = "\n".join(
+                f"{names.get(emoji) or self.bot.get_emoji(emoji) or emoji} {count}" for emoji, count in usage
+            )
+            pages = pagify(stats_message)
+            await SimpleMenu(list(pages), disable_after_timeout=True).start(ctx)
+            return
+
         if not emoji_usage:
             await ctx.send("No emoji stats recorded yet.")
             return
@@ -123,11 +215,27 @@ class EmojiManager(commands.Cog):
             await self.config.guild(ctx.guild).enabled.set(True)
             await ctx.send("enabled emojistats.")
 
+    @commands.command()
+    @commands.has_permissions(manage_emojis = True)
+    async def emojistatstrack(self, ctx: commands.Context, dimension: Literal["channel", "user"]):
+        "Enable or Disable per-channel or per-user emoji stats."
+        setting = self.config.guild(ctx.guild).get_attr(f"track_{dimension}")
+        if await setting():
+            await setting.set(False)
+            await ctx.send(f"disabled per-{dimension} emojistats.")
+        else:
+            await setting.set(True)
+            await ctx.send(f"enabled per-{dimension} emojistats.")
+
     @commands.command()
     @commands.has_permissions(manage_emojis = True)
     async def emojistatsreset(self, ctx: commands.Context):
         """Reset emoji stats."""
         await self.config.guild(ctx.guild).emoji_usage.set({})
+        for dimension in DIMENSIONS:
+            self.usage.pop((ctx.guild.id, dimension), None)
+            self.dirty.discard((ctx.guild.id, dimension))
+            await self.config.guild(ctx.guild).get_attr(f"{dimension}_usage").clear()
         await ctx.send("Emoji stats have been reset.")
 
     @commands.command()
@@ -143,6 +251,14 @@ class EmojiManager(commands.Cog):
                 _ = emoji_usage.pop(emoji_str)
 
         await self.config.guild(ctx.guild).emoji_usage.set(emoji_usage)
+
+        existing_ids = {emoji.id for emoji in ctx.guild.emojis}
+        for dimension in DIMENSIONS:
+            table = await self.get_usage_table(ctx.guild.id, dimension)
+            if not table:
+                continue
+            self.usage[(ctx.guild.id, dimension)] = table.retain(lambda _, emoji: emoji in existing_ids)
+            self.dirty.add((ctx.guild.id, dimension))
         await ctx.send("done.")
 
 
@@ -150,21 +266,47 @@ class EmojiManager(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
-        if message.author.bot or not message.guild:
+        core = self.bot.get_cog("NcogsCore")
+        if core is None:
+            if message.author.bot or not message.guild:
+                return
+            emojis = {match.group(0) for match in CUSTOM_EMOJI_RE.finditer(message.content)}
+            if emojis:
+                await self.count_emojis(message, emojis)
             return
+        with core.metrics.timer("emojimanager.on_message"):
+            info = core.preprocess(message)
+            if info.from_bot or info.guild_id is None or not info.emojis:
+                return
+            await self.count_emojis(message, info.emojis)
+            core.metrics.incr("emojimanager.emojis_counted", len(info.emojis))
 
-        enabled = await self.config.guild(message.guild).enabled()
+    async def count_emojis(self, message: discord.Message, emojis):
+        guild_config = self.config.guild(message.guild)
+        enabled = await guild_config.enabled()
         if not enabled:
             return
 
-        emoji_usage = await self.config.guild(message.guild).emoji_usage()
-        unique_emojis = set(re.findall(r"<a?:\w+:\d+>", message.content))
-
-        for emoji_str in unique_emojis:  
+        emoji_usage = await guild_config.emoji_usage()
+        for emoji_str in emojis:  
             emoji_usage[emoji_str] = emoji_usage.get(emoji_str, 0) + 1
 
-        await self.config.guild(message.guild).emoji_usage.set(emoji_usage)
+        await guild_config.emoji_usage.set(emoji_usage)
+
+        # Threads count towards the channel they were started in.
+        channel = message.channel
+        channel_id = channel.parent_id if isinstance(channel, discord.Thread) else channel.id
+        for dimension, dim_id in (("channel", channel_id), ("user", message.author.id)):
+            if not await guild_config.get_attr(f"track_{dimension}")():
+                continue
+            table = await self.get_usage_table(message.guild.id, dimension)
+            for emoji_str in emojis:
+                table.add(dim_id, emoji_id(emoji_str))
+            self.dirty.add((message.guild.id, dimension))
+
 
+def emoji_id(emoji_str: str) -> int:
+    return int(emoji_str[emoji_str.rindex(":") + 1:-1])
 
 async def fetch_emoji(url: str) -> bytes:
     async with aiohttp.ClientSession() as session:
@@ -177,4 +319,4 @@ async def fetch_emoji(url: str) -> bytes:
             return await resp.read()
         
         
-MAX_EMOJI_SIZE = 256 * 1024
\ No newline at end of file
+MAX_EMOJI_SIZE = 256 * 1024
@@ -0,0 +1,55 @@
+from array import array
+from typing import Callable, Dict, List, Tuple
+
+class UsageTable:
+    """
+    Emoji counts along one dimension (channels or users) of a guild, kept as columns.
+
+    Row `i` says emoji `emoji_ids[i]` was used `counts[i]` times in channel, or by
+    user, `dim_ids[i]`. The columns are saved to Config as plain int lists.
+    """
+    def __init__(self, dim_ids=(), emoji_ids=(), counts=()) -> None:
+        self.dim_ids = array("q", dim_ids)
+        self.emoji_ids = array("q", emoji_ids)
+        self.counts = array("q", counts)
+        self.rows: Dict[Tuple[int, int], int] = {}
+        self.by_dim: Dict[int, List[int]] = {}
+        for row, key in enumerate(zip(self.dim_ids, self.emoji_ids)):
+            self.rows[key] = row
+            self.by_dim.setdefault(key[0], []).append(row)
+
+    @classmethod
+    def from_config(cls, data: dict) -> "UsageTable":
+        return cls(data.get("dim_ids", ()), data.get("emoji_ids", ()), data.get("counts", ()))
+
+    def to_config(self) -> dict:
+        return {"dim_ids": self.dim_ids.tolist(), "emoji_ids": self.emoji_ids.tolist(), "counts": self.counts.tolist()}
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def add(self, dim_id: int, emoji_id: int, count: int = 1) -> None:
+        row = self.rows.get((dim_id, emoji_id))
+        if row is not None:
+            self.counts[row] += count
+            return
+        row = len(self.counts)
+        self.dim_ids.append(dim_id)
+        self.emoji_ids.append(emoji_id)
+        self.counts.append(count)
+        self.rows[(dim_id, emoji_id)] = row
+        self.by_dim.setdefault(dim_id, []).append(row)
+
+    def usage(self, dim_id: int) -> List[Tuple[int, int]]:
+        """`(emoji_id, count)` pairs for one channel or user, most used first."""
+        rows = self.by_dim.get(dim_id, ())
+        return sorted(((self.emoji_ids[row], self.counts[row]) for row in rows), key=lambda x: x[1], reverse=True)
+
+    def retain(self, keep: Callable[[int, int], bool]) -> "UsageTable":
+        """Return a copy with only the rows where `keep(dim_id, emoji_id)` is true."""
+        rows = [i for i, key in enumerate(zip(self.dim_ids, self.emoji_ids)) if keep(*key)]
+        return UsageTable(
+            (self.dim_ids[i] for i in rows),
+            (self.emoji_ids[i] for i in rows),
+            (self.counts[i] for i in rows),
+        )
@@ -11,6 +11,10 @@ from redbot.core.config import Config
 from redbot.core.utils.menus import menu
 
 
+TRIGGER_GLOBALS = {
+    "__builtins__": {},
+    "random": random,
+}
 
 class MessageTriggers(commands.Cog):
     def __init__(self, bot):
@@ -59,7 +63,7 @@ class MessageTriggers(commands.Cog):
         The <condition> must evaluate to a boolean (`True` or `False`).
         The <response> must evaluate to a string.
 
-        available variable: message, bot
+        available variable: message, bot, content (message content in lowercase)
         available module: random
 
         """
@@ -71,16 +75,12 @@ class MessageTriggers(commands.Cog):
             response = command_str.split("SEND ", 1)[-1]
 
             message = ctx.message
-            context = {"message": message, "bot": ctx.bot}
-            _globals = {
-                "__builtins__": {},
-                "random": random,
-            }
-            m = eval(condition, _globals, context)
+            context = {"message": message, "bot": ctx.bot, "content": message.content.lower()}
+            m = eval(condition, TRIGGER_GLOBALS, context)
             if m not in (True, False):
                 await ctx.send("The condition must evaluate to a bool.")
                 return
-            n = eval(response, _globals, context)
+            n = eval(response, TRIGGER_GLOBALS, context)
             if type(n) != str:
                 await ctx.send("The content must evaluate to a string.")
 
@@ -163,11 +163,27 @@ class MessageTriggers(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
-        if message.author.bot:
-            return
-
         if not self.triggers:
             return
+        core = self.bot.get_cog("NcogsCore")
+        if core is None:
+            if message.author.bot:
+                return
+            await self.run_triggers(message, message.content.lower())
+            return
+        with core.metrics.timer("messagetriggers.on_message"):
+            info = core.preprocess(message)
+            if info.from_bot:
+                return
+            sent = await self.run_triggers(message, info.lowered)
+            core.metrics.incr("messagetriggers.responses", sent)
+
+    async def run_triggers(self, message: discord.Message, content: str) -> int:
+        # Stored triggers have always run with the module's globals and builtins, unlike the IF check.
+        context = {"self": self, "message": message, "bot": self.bot, "content": content}
+        sent = 0
         for _, condition, response in self.triggers:
-            if eval(condition) == True:
-                await message.channel.send(eval(response))
+            if eval(condition, globals(), context) == True:
+                await message.channel.send(eval(response, globals(), context))
+                sent += 1
+        return sent
@@ -1,11 +1,19 @@
 # https://github.com/tmercswims/tmerc-cogs/blob/v3/nestedcommands/nestedcommands.py
 
+import time
+from collections import deque
+from datetime import datetime, timezone
 from redbot.core import commands
+from redbot.core.utils.chat_formatting import box, pagify
+
+TRACE_FLAG = "--trace"
+TRACE_HISTORY_SIZE = 50
 
 class MultiCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.active = set()  
+        self.active = set()
+        self.traces = deque(maxlen=TRACE_HISTORY_SIZE)
 
     async def red_delete_data_for_user(self, **kwargs):
         """Nothing to delete"""
@@ -21,10 +29,54 @@ class MultiCommands(commands.Cog):
             return False
         return True
 
+    def _split(self, commands_text: str) -> tuple[list, bool]:
+        commands = commands_text.split("\n")
+        trace = bool(commands) and commands[0].strip() == TRACE_FLAG
+        if trace:
+            commands = commands[1:]
+        return commands, trace
+
+    async def _run_step(self, message, step: dict) -> None:
+        # Wall time of the command, including any time other tasks ran while it awaited.
+        started = time.perf_counter()
+        await self.bot.process_commands(message)
+        step["command_wall"] = time.perf_counter() - started
+        core = self.bot.get_cog("NcogsCore")
+        if core is not None and core.metrics.enabled:
+            core.metrics.observe("multicommands.command_wall", step["command_wall"])
+
+    def _record_trace(self, ctx: commands.Context, kind: str, steps: list) -> dict:
+        trace = {
+            "kind": kind,
+            "user_id": ctx.author.id,
+            "guild_id": ctx.guild.id if ctx.guild else None,
+            "timestamp": int(datetime.now(timezone.utc).timestamp()),
+            "steps": steps,
+        }
+        self.traces.append(trace)
+        return trace
+
+    async def _send_trace(self, ctx: commands.Context, trace: dict) -> None:
+        for page in pagify(self.format_trace(trace)):
+            await ctx.send(box(page))
+
+    @staticmethod
+    def format_trace(trace: dict) -> str:
+        lines = [f"{'#':>2} {'wall':>8} {'cmd wall':>8} {'payload':>8}  command"]
+        for i, step in enumerate(trace["steps"], 1):
+            lines.append(
+                f"{i:>2} {step['wall'] * 1000:>6.1f}ms {step['command_wall'] * 1000:>6.1f}ms "
+                f"{step['payload']:>7}B  {step['command'][:40]}"
+            )
+        total = sum(step["wall"] for step in trace["steps"])
+        lines.append(f"{trace['kind']}: {len(trace['steps'])} steps in {total * 1000:.1f}ms")
+        return "\n".join(lines)
+
     @commands.command()
     async def invoke(self, ctx: commands.Context, *,commands_text: str):
         """
         Simply runs multiple commands in order separated by a newline.
+        Start with a `--trace` line to get per-step timings at the end.
 
 
         Usage:
@@ -38,18 +90,27 @@ class MultiCommands(commands.Cog):
             return
         self.active.add(ctx.author.id)
         message = ctx.message
-        commands = commands_text.split("\n")
+        commands, trace = self._split(commands_text)
+        steps = []
 
-        for command_text in commands:
-            command_text = command_text.strip()
-            if not await self._usable(ctx, command_text):
-                continue
+        try:
+            for command_text in commands:
+                command_text = command_text.strip()
+                if not await self._usable(ctx, command_text):
+                    continue
 
-            message.content = command_text
-            await ctx.send(f"-# invoking `{message.content}`")
-            await self.bot.process_commands(message)
+                step_start = time.perf_counter()
+                message.content = command_text
+                await ctx.send(f"-# invoking `{message.content}`")
+                step = {"command": command_text, "payload": 0}
+                await self._run_step(message, step)
+                step["wall"] = time.perf_counter() - step_start
+                steps.append(step)
+        finally:
+            self.active.remove(ctx.author.id)
 
-        self.active.remove(ctx.author.id)
+        if trace and steps:
+            await self._send_trace(ctx, self._record_trace(ctx, "invoke", steps))
 
 
     @commands.command()
@@ -57,6 +118,7 @@ class MultiCommands(commands.Cog):
         """
         Runs multiple commands in order separated by a newline.
         Each command (except the first) uses the bot's previous message as an argument for the next.
+        Start with a `--trace` line to get per-step timings at the end.
 
         Usage:
         ```[p]pipe
@@ -70,25 +132,55 @@ class MultiCommands(commands.Cog):
         self.active.add(ctx.author.id)
 
         message = ctx.message
-        commands = commands_text.split("\n")
+        commands, trace = self._split(commands_text)
         invoked_command = False
         last_message = ""
-      
-        for command_text in commands:
-            command_text = command_text.strip()
-            if not await self._usable(ctx, command_text):
-                continue
-            if invoked_command == True:
-                last_message = (await anext(message.channel.history(limit=1))).content
-
-            if last_message:
-                message.content = command_text + " " + last_message
-            else:
-                message.content = command_text 
-        
-            await ctx.send(f"-# invoking `{message.content}`")
-            await self.bot.process_commands(message)
-            invoked_command = True
-            last_message = ""
-
-        self.active.remove(ctx.author.id)
\ No newline at end of file
+        steps = []
+
+        try:
+            for command_text in commands:
+                command_text = command_text.strip()
+                if not await self._usable(ctx, command_text):
+                    continue
+                step_start = time.perf_counter()
+                if invoked_command == True:
+                    last_message = (await anext(message.channel.history(limit=1))).content
+
+                if last_message:
+                    message.content = command_text + " " + last_message
+                else:
+                    message.content = command_text
+
+                await ctx.send(f"-# invoking `{message.content}`")
+                step = {"command": command_text, "payload": len(last_message.encode())}
+                await self._run_step(message, step)
+                step["wall"] = time.perf_counter() - step_start
+                steps.append(step)
+                invoked_command = True
+                last_message = ""
+        finally:
+            self.active.remove(ctx.author.id)
+
+        if trace and steps:
+            await self._send_trace(ctx, self._record_trace(ctx, "pipe", steps))
+
+    @commands.command()
+    @commands.is_owner()
+    async def multitrace(self, ctx: commands.Context, count: int = 5):
+        """
+        Show the most recent `invoke`/`pipe` traces.
+
+        Only runs started with `--trace` are kept, up to the last 50.
+        """
+        traces = list(self.traces)[-count:] if count > 0 else []
+        if not traces:
+            await ctx.send("No traces recorded yet.")
+            return
+
+        text = "\n\n".join(
+            f"user {trace['user_id']} at {datetime.fromtimestamp(trace['timestamp'], timezone.utc):%Y-%m-%d %H:%M:%S} UTC\n"
+            f"{self.format_trace(trace)}"
+            for trace in reversed(traces)
+        )
+        for page in pagify(text, delims=["\n\n", "\n"]):
+            await ctx.send(box(page))
@@ -0,0 +1,96 @@
+import json
+import asyncio
+import logging
+import discord
+from datetime import datetime, timezone
+
+from redbot.core import commands, Config
+from redbot.core.data_manager import cog_data_path
+from redbot.core.utils.chat_formatting import box, pagify
+
+from .metrics import MetricsRegistry
+from .preprocess import MessagePreprocessor, MessageInfo
+
+log = logging.getLogger('red.ncogs.core')
+
+class NcogsCore(commands.Cog):
+    """
+    Shared pieces for the other ncogs cogs: metrics and message preprocessing.
+
+    Cogs look this up with `bot.get_cog("NcogsCore")` and carry on without it
+    when it isn't loaded.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self.config = Config.get_conf(self, identifier=6250917342)
+        self.config.register_global(metrics_enabled=False)
+        self.metrics = MetricsRegistry()
+        self.preprocessor = MessagePreprocessor()
+
+    async def red_delete_data_for_user(self, **kwargs):
+        """Nothing to delete"""
+        return
+
+    async def cog_load(self):
+        self.metrics.enabled = await self.config.metrics_enabled()
+
+    def preprocess(self, message: discord.Message) -> MessageInfo:
+        """Shared per-message scan for on_message listeners."""
+        info, cached = self.preprocessor.get(message)
+        self.metrics.incr("ncogscore.preprocess_hits" if cached else "ncogscore.preprocess_misses")
+        return info
+
+    @commands.is_owner()
+    @commands.group(name="metrics")
+    async def metrics_group(self, ctx: commands.Context):
+        """View hot-path counters and latencies of ncogs cogs."""
+        pass
+
+    @metrics_group.command(name="toggle")
+    async def metrics_toggle(self, ctx: commands.Context):
+        """Enable or disable metrics collection."""
+        self.metrics.enabled = not self.metrics.enabled
+        await self.config.metrics_enabled.set(self.metrics.enabled)
+        await ctx.send(f"{'enabled' if self.metrics.enabled else 'disabled'} metrics.")
+
+    @metrics_group.command(name="show")
+    async def metrics_show(self, ctx: commands.Context, prefix: str = ""):
+        """Show counters and latency percentiles, optionally only names starting with `prefix`."""
+        lines = []
+        histograms = sorted(i for i in self.metrics.histograms.items() if i[0].startswith(prefix))
+        if histograms:
+            lines.append(f"{'name':<32} {'count':>8} {'mean':>9} {'p50':>9} {'p99':>9} {'max':>9}")
+            for name, histogram in histograms:
+                mean = histogram.sum / histogram.total if histogram.total else 0.0
+                lines.append(
+                    f"{name:<32} {histogram.total:>8} {mean * 1000:>7.2f}ms "
+                    f"{histogram.percentile(50) * 1000:>7.2f}ms {histogram.percentile(99) * 1000:>7.2f}ms "
+                    f"{histogram.max * 1000:>7.2f}ms"
+                )
+        counters = sorted(i for i in self.metrics.counters.items() if i[0].startswith(prefix))
+        if counters:
+            if lines:
+                lines.append("")
+            lines.extend(f"{name:<32} {value:>8}" for name, value in counters)
+        if not lines:
+            state = "" if self.metrics.enabled else " Metrics are disabled, use `metrics toggle`."
+            await ctx.send(f"Nothing recorded yet.{state}")
+            return
+        for page in pagify("\n".join(lines), page_length=1900):
+            await ctx.send(box(page))
+
+    @metrics_group.command(name="dump")
+    async def metrics_dump(self, ctx: commands.Context):
+        """Write the current metrics to a JSON file in the cog's data folder."""
+        now = datetime.now(timezone.utc)
+        data = {"timestamp": int(now.timestamp()), **self.metrics.snapshot()}
+        path = cog_data_path(self) / f"metrics-{now.strftime('%Y%m%d-%H%M%S')}.json"
+        await asyncio.to_thread(path.write_text, json.dumps(data, indent=2))
+        log.info(f"Dumped metrics to {path}")
+        await ctx.send(f"Dumped metrics to `{path}`.")
+
+    @metrics_group.command(name="reset")
+    async def metrics_reset(self, ctx: commands.Context):
+        """Clear all recorded metrics."""
+        self.metrics.reset()
+        await ctx.send("Metrics have been reset.")
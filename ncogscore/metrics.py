@@ -0,0 +1,99 @@
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Dict, List
+
+# Upper bounds of the latency buckets, in seconds. The last bucket catches everything slower.
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class Histogram:
+    __slots__ = ("counts", "total", "sum", "max")
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * (len(BUCKETS) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the `pct` percentile."""
+        if not self.total:
+            return 0.0
+        rank = self.total * pct / 100
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.total,
+            "sum": self.sum,
+            "max": self.max,
+            "buckets": dict(zip([*map(str, BUCKETS), "inf"], self.counts)),
+        }
+
+class Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram) -> None:
+        self.histogram = histogram
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.start)
+
+class MetricsRegistry:
+    """
+    Counters and latency histograms keyed by dotted names like `serverauctions.bid`.
+
+    While disabled every call returns straight away and `timer` hands back a shared
+    no-op context manager, so instrumented hot paths cost a lookup and a branch.
+    """
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def incr(self, name: str, value: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def timer(self, name: str):
+        if not self.enabled:
+            return NULL_TIMER
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return Timer(histogram)
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "histograms": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+        }
+
+NULL_TIMER = nullcontext()
@@ -0,0 +1,47 @@
+import re
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import discord
+
+CUSTOM_EMOJI_RE = re.compile(r"<a?:\w+:(\d+)>")
+PREPROCESS_CACHE_SIZE = 1024
+
+class MessageInfo:
+    """What the on_message listeners need from a message, worked out once."""
+    __slots__ = ("from_bot", "guild_id", "channel_id", "author_id", "lowered", "emojis", "emoji_ids")
+
+    def __init__(self, message: discord.Message) -> None:
+        self.from_bot: bool = message.author.bot
+        self.guild_id: Optional[int] = message.guild.id if message.guild else None
+        self.channel_id: int = message.channel.id
+        self.author_id: int = message.author.id
+        self.lowered: str = message.content.lower()
+        emojis = {}
+        for match in CUSTOM_EMOJI_RE.finditer(message.content):
+            emojis.setdefault(match.group(0), int(match.group(1)))
+        # Unique custom emoji strings in order of first use, and their ids.
+        self.emojis: Tuple[str, ...] = tuple(emojis)
+        self.emoji_ids: Tuple[int, ...] = tuple(emojis.values())
+
+class MessagePreprocessor:
+    """
+    Caches a `MessageInfo` per message id so every listener reuses one scan.
+
+    A least recently used cache of `size` messages; listeners for a message run
+    right after it arrives, so older entries are rarely asked for again.
+    """
+    def __init__(self, size: int = PREPROCESS_CACHE_SIZE) -> None:
+        self.size = size
+        self.cache: OrderedDict[int, MessageInfo] = OrderedDict()
+
+    def get(self, message: discord.Message) -> Tuple[MessageInfo, bool]:
+        """Return the message's info and whether it came from the cache."""
+        info = self.cache.get(message.id)
+        if info is not None:
+            self.cache.move_to_end(message.id)
+            return info, True
+        info = self.cache[message.id] = MessageInfo(message)
+        if len(self.cache) > self.size:
+            self.cache.popitem(last=False)
+        return info, False
@@ -1,6 +1,6 @@
 from .auction import ServerAuctions
 
-__red_end_user_data_statement__ = "This cog does not store any user data except for user ids to track auctions"
+__red_end_user_data_statement__ = "This cog stores the user ids of auctioneers, auction hosts and bidders to run auctions and keep an auction history. Deleting a user's data removes auctions they host, withdraws their leading bids and blanks their ids in the history."
 
 async def setup(bot):
     await bot.add_cog(ServerAuctions(bot))
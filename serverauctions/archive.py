@@ -0,0 +1,150 @@
+import asyncio
+import sqlite3
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS closed_auctions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    auction_id INTEGER NOT NULL,
+    name TEXT,
+    host_id INTEGER,
+    winner_id INTEGER,
+    final_bid NUMERIC,
+    bid_count INTEGER NOT NULL DEFAULT 0,
+    created_at INTEGER,
+    closed_at INTEGER NOT NULL,
+    removed INTEGER NOT NULL DEFAULT 0,
+    unpaid INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_closed_guild ON closed_auctions (guild_id, id);
+CREATE INDEX IF NOT EXISTS idx_closed_host ON closed_auctions (guild_id, host_id, id);
+CREATE INDEX IF NOT EXISTS idx_closed_winner ON closed_auctions (guild_id, winner_id, id);
+"""
+
+# Archives from before user data deletion required a host, so the table is copied without that constraint.
+MIGRATE_HOST_NULLABLE = """
+BEGIN;
+DROP INDEX IF EXISTS idx_closed_guild;
+DROP INDEX IF EXISTS idx_closed_host;
+DROP INDEX IF EXISTS idx_closed_winner;
+ALTER TABLE closed_auctions RENAME TO closed_auctions_old;
+""" + SCHEMA + """
+INSERT INTO closed_auctions (id, guild_id, auction_id, name, host_id, winner_id, final_bid, bid_count, created_at, closed_at, removed)
+SELECT id, guild_id, auction_id, name, host_id, winner_id, final_bid, bid_count, created_at, closed_at, removed FROM closed_auctions_old;
+DROP TABLE closed_auctions_old;
+COMMIT;
+"""
+
+class AuctionArchive:
+    """
+    Append-only SQLite archive of closed auctions.
+
+    Rows are only ever inserted, except that deleting a user's data blanks their
+    ids. Queries page backwards by row id so a page costs the same no matter how
+    large the archive gets.
+    """
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.conn: Optional[sqlite3.Connection] = None
+        self.lock = asyncio.Lock()
+
+    async def open(self) -> None:
+        def _open():
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row["name"]: row for row in conn.execute("PRAGMA table_info(closed_auctions)")}
+            if columns["host_id"]["notnull"]:
+                conn.executescript(MIGRATE_HOST_NULLABLE)
+            elif "unpaid" not in columns:
+                conn.execute("ALTER TABLE closed_auctions ADD COLUMN unpaid INTEGER NOT NULL DEFAULT 0")
+            return conn
+        self.conn = await asyncio.to_thread(_open)
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    async def _run(self, func):
+        async with self.lock:
+            return await asyncio.to_thread(func)
+
+    async def append(self, guild_id: int, auction_data: dict, removed: bool = False, unpaid: bool = False) -> None:
+        closed_at = int(datetime.now(timezone.utc).timestamp())
+        final_bid = auction_data["current_bid"]
+        row = (
+            guild_id,
+            auction_data["auction_id"],
+            auction_data.get("name"),
+            auction_data["host_id"],
+            auction_data["current_bidder"],
+            # NUMERIC affinity stores this as an integer when it fits and a real otherwise.
+            str(final_bid) if final_bid is not None else None,
+            auction_data.get("bid_count", 0),
+            auction_data.get("created_at"),
+            closed_at,
+            int(removed),
+            int(unpaid),
+        )
+        def _insert():
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO closed_auctions (guild_id, auction_id, name, host_id, winner_id, final_bid, "
+                    "bid_count, created_at, closed_at, removed, unpaid) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                )
+        await self._run(_insert)
+
+    async def forget_user(self, user_id: int) -> None:
+        """Blank a user's id wherever they hosted or won an auction."""
+        def _update():
+            with self.conn:
+                self.conn.execute("UPDATE closed_auctions SET host_id = NULL WHERE host_id = ?", (user_id,))
+                self.conn.execute("UPDATE closed_auctions SET winner_id = NULL WHERE winner_id = ?", (user_id,))
+        await self._run(_update)
+
+    async def page(
+        self, guild_id: int, member_id: Optional[int] = None, before: Optional[int] = None, limit: int = 10
+    ) -> List[sqlite3.Row]:
+        """Return up to `limit` auctions older than row id `before`, newest first."""
+        query = "SELECT * FROM closed_auctions WHERE guild_id = ?"
+        params = [guild_id]
+        if member_id is not None:
+            # Each side of the OR is served by its own index.
+            query = (
+                "SELECT * FROM (SELECT * FROM closed_auctions WHERE guild_id = ? AND host_id = ? "
+                "UNION SELECT * FROM closed_auctions WHERE guild_id = ? AND winner_id = ?) WHERE 1"
+            )
+            params = [guild_id, member_id, guild_id, member_id]
+        if before is not None:
+            query += " AND id < ?"
+            params.append(before)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        return await self._run(lambda: self.conn.execute(query, params).fetchall())
+
+    async def stats(self, guild_id: int, member_id: Optional[int] = None) -> sqlite3.Row:
+        # Sales whose winning bid was never paid don't count as sold.
+        sale = "CASE WHEN unpaid = 0 THEN final_bid END"
+        query = (
+            f"SELECT COUNT(*) AS auctions, COUNT({sale}) AS sold, SUM({sale}) AS volume, "
+            f"MAX({sale}) AS highest, AVG({sale}) AS average, SUM(bid_count) AS bids, "
+            "AVG(closed_at - created_at) AS duration FROM closed_auctions WHERE guild_id = ? AND removed = 0"
+        )
+        params = [guild_id]
+        if member_id is not None:
+            query += " AND host_id = ?"
+            params.append(member_id)
+        return await self._run(lambda: self.conn.execute(query, params).fetchone())
+
+    async def winner_stats(self, guild_id: int, member_id: int) -> sqlite3.Row:
+        query = (
+            "SELECT COUNT(*) AS won, SUM(final_bid) AS spent FROM closed_auctions "
+            "WHERE guild_id = ? AND winner_id = ? AND removed = 0 AND unpaid = 0"
+        )
+        return await self._run(lambda: self.conn.execute(query, (guild_id, member_id)).fetchone())
@@ -1,9 +1,25 @@
+import uuid
 import discord
 import asyncio
 import logging
+from pathlib import Path
 from redbot.core import commands, Config, bank
+from redbot.core.data_manager import cog_data_path
 from datetime import datetime, timezone
-from .view import AuctionSetup
+from .view import AuctionSetup, ArchivePages, auction_embed
+from .scheduler import AuctionScheduler
+from .store import AuctionStore
+from .backend import ConfigBackend, SQLiteBackend
+from .escrow import EscrowLedger
+from .archive import AuctionArchive
+from .notify import DMNotifier
+
+EMBED_EDIT_INTERVAL = 2.0
+MESSAGE_FETCH_CONCURRENCY = 4
+END_RETRY_DELAY = 60
+CLOSE_LEASE_TTL = 300
+DEADLINE_SYNC_INTERVAL = 30
+BID_ATTEMPTS = 3
 
 class ServerAuctions(commands.Cog):
     """Auction management."""
@@ -13,69 +29,237 @@ class ServerAuctions(commands.Cog):
         self.config = Config.get_conf(self, identifier=666664321)
         self.config.register_guild(
             auctions=[],
+            auction_records={},
+            escrow={},
+            escrow_migrated=False,
             auction_count=0,
             use_bank=False
         )
         self.config.register_member(auctioneer=False)
-        self.auction_tasks = {}
-        self.auction_messages = {}
-        self.bot.loop.create_task(self.initialize_pending_auctions())
-
-        self.initializing_auctions = True
-
-    async def red_delete_data_for_user(self, **kwargs):
-        """Nothing to delete"""
-        return
+        self.config.register_global(backend="config", backend_path=None)
+        self.instance_id = uuid.uuid4().hex
+        self.backend = ConfigBackend(self.config)
+        self.store = AuctionStore(self.backend)
+        self.escrow = EscrowLedger(self.config)
+        self.archive = AuctionArchive(cog_data_path(self) / "archive.sqlite3")
+        self.scheduler = AuctionScheduler(self.end_auction)
+        self.notifier = DMNotifier()
+        self.bid_locks = {}
+        self.end_retries = set()
+        self.embed_updates = {}
+        self.fetch_semaphore = asyncio.Semaphore(MESSAGE_FETCH_CONCURRENCY)
+        self.init_task = None
+        self.sync_task = None
+
+    async def red_delete_data_for_user(self, *, requester, user_id: int):
+        for guild_id, members in (await self.config.all_members()).items():
+            if user_id in members:
+                await self.config.member_from_ids(guild_id, user_id).clear()
+        for guild_id in await self.config.all_guilds():
+            async with self.config.guild_from_id(guild_id).escrow() as escrow:
+                for auction_id, hold in list(escrow.items()):
+                    if hold["holder"] == user_id:
+                        del escrow[auction_id]
+        await self.store.load_all()
+        for (guild_id, auction_id), record in list(self.store.records.items()):
+            if user_id in (record["host_id"], record["current_bidder"]):
+                await self.drop_user_from_auction(guild_id, auction_id, user_id)
+        await self.archive.forget_user(user_id)
+
+    async def drop_user_from_auction(self, guild_id: int, auction_id: int, user_id: int) -> None:
+        """Close an auction the user hosts as removed, or withdraw their leading bid on it."""
+        guild = self.bot.get_guild(guild_id)
+        auction_data = self.store.get(guild_id, auction_id)
+        if auction_data is not None and auction_data["host_id"] == user_id:
+            if guild is None:
+                # Without the guild its thread can't be edited, so the auction is only dropped.
+                await self.clean_up_auction(discord.Object(id=guild_id), auction_id)
+                return
+            # Removing refunds the leading bid and marks the thread; the archived row's host is blanked afterwards.
+            auction_message = await self.fetch_auction_message(guild, auction_id)
+            if auction_message is not None:
+                await self.close_auction(auction_message, auction_id, force_close=True)
+            return
+        async with self.get_bid_lock(guild_id, auction_id):
+            auction_data = await self.store.refresh(guild_id, auction_id)
+            while auction_data is not None and auction_data["current_bidder"] == user_id:
+                if await self.store.save(guild_id, dict(auction_data, current_bidder=None, current_bid=None, held=0)):
+                    if guild is not None:
+                        await self.escrow.refund(guild, auction_data)
+                    self.request_embed_update(guild_id, auction_id)
+                    break
+                auction_data = await self.store.refresh(guild_id, auction_id)
+
+    async def cog_load(self) -> None:
+        path = Path(await self.config.backend_path() or cog_data_path(self) / "auctions.sqlite3")
+        if await self.config.backend() == "sqlite":
+            self.backend = SQLiteBackend(path)
+            await self.backend.open()
+            await self.migrate_to_backend()
+            self.store = AuctionStore(self.backend)
+        elif path.exists():
+            await self.migrate_from_sqlite(path)
+        await self.archive.open()
+        self.scheduler.start()
+        self.notifier.start()
+        self.init_task = self.bot.loop.create_task(self.initialize_pending_auctions())
+        self.sync_task = self.bot.loop.create_task(self.sync_deadlines())
 
     def cog_unload(self) -> None:
-        for task in self.auction_tasks.values():
+        if self.init_task is not None:
+            self.init_task.cancel()
+        if self.sync_task is not None:
+            self.sync_task.cancel()
+        self.scheduler.stop()
+        self.notifier.stop()
+        self.archive.close()
+        self.backend.close()
+        for task in self.embed_updates.values():
             task.cancel()
-        self.auction_tasks.clear()
-
-    def get_cached_auction_message(self, auction_id: int) -> discord.Message:
-        return self.auction_messages.get(auction_id)
-
-    def cache_auction_message(self, auction_id: int, message: discord.Message):
-        self.auction_messages[auction_id] = message
+        self.embed_updates.clear()
+
+    def schedule_auction_end(self, guild_id: int, auction_data: dict) -> None:
+        self.scheduler.schedule((guild_id, auction_data["auction_id"]), auction_data["end_timestamp"])
+
+    def get_bid_lock(self, guild_id: int, auction_id: int) -> asyncio.Lock:
+        return self.bid_locks.setdefault((guild_id, auction_id), asyncio.Lock())
+
+    def request_embed_update(self, guild_id: int, auction_id: int) -> None:
+        # A pending edit always renders the latest record, so later bids just ride along.
+        key = (guild_id, auction_id)
+        if key not in self.embed_updates:
+            self.embed_updates[key] = asyncio.create_task(self.flush_embed_update(key))
+
+    async def flush_embed_update(self, key: tuple) -> None:
+        await asyncio.sleep(EMBED_EDIT_INTERVAL)
+        self.embed_updates.pop(key, None)
+        guild = self.bot.get_guild(key[0])
+        auction_data = self.store.get(*key)
+        if guild is None or auction_data is None:
+            return
+        try:
+            auction_message = await self.fetch_auction_message(guild, key[1])
+            if auction_message is not None:
+                await auction_message.edit(embed=auction_embed(auction_data))
+        except discord.HTTPException as e:
+            self.log.warning(f"Failed to update auction #{key[1]} in guild {key[0]}: {e}")
+
+    async def migrate_to_backend(self) -> None:
+        """Move auctions and id counters still held in Config into the shared backend."""
+        config_backend = ConfigBackend(self.config)
+        for guild_id, data in (await self.config.all_guilds()).items():
+            await self.backend.seed_auction_id(guild_id, data.get("auction_count", 0))
+            if not data.get("auction_records") and not data.get("auctions"):
+                continue
+            for record in await config_backend.load_guild(guild_id):
+                # Versions start over in the new backend.
+                record["version"] = 0
+                await self.backend.save(guild_id, record)
+            await self.config.guild_from_id(guild_id).auction_records.clear()
+
+    async def migrate_from_sqlite(self, path: Path) -> None:
+        """Move auctions and id counters left in a SQLite backend back into Config."""
+        sqlite_backend = SQLiteBackend(path)
+        await sqlite_backend.open()
+        try:
+            for guild_id, last_id in await sqlite_backend.last_auction_ids():
+                await self.backend.seed_auction_id(guild_id, last_id)
+            for guild_id, records in (await sqlite_backend.load_all()).items():
+                for record in records:
+                    # Versions start over in the new backend.
+                    if await self.backend.save(guild_id, dict(record, version=0)):
+                        await sqlite_backend.remove(guild_id, record["auction_id"])
+        finally:
+            sqlite_backend.close()
 
     async def initialize_pending_auctions(self):
         await self.bot.wait_until_ready()
+        # Timers only need the stored records; auction messages are fetched when first used.
+        await self.store.load_all()
+        for guild_id in await self.config.all_guilds():
+            guild = self.bot.get_guild(guild_id)
+            if guild is not None:
+                await self.escrow.load(guild, self.store)
         total_auctions = 0
-        for guild in self.bot.guilds:
-            guild_config = self.config.guild(guild)
-            auctions = await guild_config.auctions()
-            valid_auctions = []
-
-            fetch_tasks = [self.try_fetch_message(guild, auction["thread_id"], auction["message_id"]) for auction in auctions]
-            messages = await asyncio.gather(*fetch_tasks, return_exceptions=True)
-            for auction, message in zip(auctions, messages):
-                if isinstance(message, Exception) or not message:
-                    continue
-                if auction["auction_id"] not in self.auction_messages:
-                    self.cache_auction_message(auction["auction_id"], message)
-
-                task = asyncio.create_task(self.schedule_auction_end(message, auction))
-                self.auction_tasks[auction["auction_id"]] = task
-                valid_auctions.append(auction)
-                total_auctions += 1
-
-            await guild_config.auctions.set(valid_auctions)
+        for (guild_id, auction_id), auction in list(self.store.records.items()):
+            self.schedule_auction_end(guild_id, auction)
+            total_auctions += 1
+
         if total_auctions > 0:
             self.log.info(f"Scheduled {total_auctions} auctions across all guilds.")
-        self.initializing_auctions = False
-
-    async def schedule_auction_end(self, auction_message: discord.Message, auction_data: dict):
-        now = datetime.now(timezone.utc).timestamp()
-        remaining_time = auction_data["end_timestamp"] - now
-        if remaining_time > 0:
-            await asyncio.sleep(remaining_time)
-        await self.close_auction(auction_message, auction_data["auction_id"])
 
-    async def try_dm(self, user: discord.User, message: str) -> None:
+    async def sync_deadlines(self) -> None:
+        """Schedule auctions that other processes sharing the backend created or extended."""
+        while True:
+            await asyncio.sleep(DEADLINE_SYNC_INTERVAL)
+            until = datetime.now(timezone.utc).timestamp() + 2 * DEADLINE_SYNC_INTERVAL
+            try:
+                for guild_id, auction_id, end_timestamp in await self.backend.upcoming(until):
+                    key = (guild_id, auction_id)
+                    # Auctions waiting to retry keep their retry time; other processes end auctions in guilds this one can't see.
+                    if key in self.end_retries or self.bot.get_guild(guild_id) is None:
+                        continue
+                    if self.scheduler.deadlines.get(key) != end_timestamp:
+                        self.scheduler.schedule(key, end_timestamp)
+            except Exception:
+                self.log.exception("Failed to sync auction deadlines from the backend.")
+
+    async def fetch_auction_message(self, guild: discord.Guild, auction_id: int) -> discord.PartialMessage:
+        """Return a partial message for editing the auction. Drops the auction if its thread or message is gone."""
+        auction_data = self.store.get(guild.id, auction_id)
+        if auction_data is None:
+            return None
+        if "name" not in auction_data:
+            # Records from before the embed state was stored need one fetch to capture it.
+            async with self.fetch_semaphore:
+                auction_message = await self.try_fetch_message(guild, auction_data["thread_id"], auction_data["message_id"])
+            if auction_message is None:
+                await self.discard_auction(guild, auction_id)
+                return None
+            embed = auction_message.embeds[0]
+            await self.store.save(guild.id, dict(
+                auction_data,
+                name=embed.title.split(" - ", 1)[-1],
+                description=embed.description,
+                host_name=(embed.footer.text or "").removeprefix("Host: "),
+            ))
+            return auction_message
+
+        channel = guild.get_channel_or_thread(auction_data["thread_id"])
+        if channel is None:
+            try:
+                async with self.fetch_semaphore:
+                    channel = await guild.fetch_channel(auction_data["thread_id"])
+            except discord.NotFound:
+                await self.discard_auction(guild, auction_id)
+                return None
+        return channel.get_partial_message(auction_data["message_id"])
+
+    async def end_auction(self, key: tuple) -> None:
+        guild_id, auction_id = key
+        self.end_retries.discard(key)
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        async with self.get_bid_lock(guild_id, auction_id):
+            # Another process may have closed the auction or pushed its deadline back.
+            auction_data = await self.store.refresh(guild_id, auction_id)
+        if auction_data is None:
+            await self.clean_up_auction(guild, auction_id)
+            return
+        if auction_data["end_timestamp"] > datetime.now(timezone.utc).timestamp():
+            self.schedule_auction_end(guild_id, auction_data)
+            return
         try:
-            await user.send(message)
-        except (discord.Forbidden, discord.HTTPException):
-            pass
+            auction_message = await self.fetch_auction_message(guild, auction_id)
+        except discord.HTTPException as e:
+            self.log.warning(f"Could not fetch auction #{auction_id} in guild {guild_id}, retrying later: {e}")
+            self.end_retries.add(key)
+            self.scheduler.schedule(key, datetime.now(timezone.utc).timestamp() + END_RETRY_DELAY)
+            return
+        if auction_message is None:
+            return
+        await self.close_auction(auction_message, auction_id)
 
     async def try_fetch_message(self, guild, channel_id: int, message_id: int) -> discord.Message:
         try:
@@ -84,38 +268,78 @@ class ServerAuctions(commands.Cog):
         except discord.NotFound:
            pass
 
-    async def update_auction_data(self, guild_config: Config, auction_data: dict) -> None:
-        async with guild_config.auctions() as auctions:
-            for i, auction in enumerate(auctions):
-                if auction["auction_id"] == auction_data["auction_id"]:
-                    auctions[i] = auction_data
-                    break
-
-    async def get_auction_data(self, guild_config: Config, auction_id: int = None, thread_id: int = None) -> dict:
-        async with guild_config.auctions() as auctions:
-            for auction in auctions:
-                if (auction_id and auction["auction_id"] == auction_id) or (thread_id and auction["thread_id"] == thread_id):
-                    return auction
-        return None
-
-    async def clean_up_auction(self, guild_config: Config, auction_id: int) -> None:
-        async with guild_config.auctions() as auctions:
-            auctions[:] = [auction for auction in auctions if auction["auction_id"] != auction_id]
-        if auction_id in self.auction_tasks:
-            self.auction_tasks[auction_id].cancel()
-            del self.auction_tasks[auction_id]
-        self.auction_messages.pop(auction_id, None)
+    async def clean_up_auction(self, guild: discord.Guild, auction_id: int) -> None:
+        await self.store.remove(guild.id, auction_id)
+        self.scheduler.cancel((guild.id, auction_id))
+        self.end_retries.discard((guild.id, auction_id))
+        self.bid_locks.pop((guild.id, auction_id), None)
+        update = self.embed_updates.pop((guild.id, auction_id), None)
+        if update is not None:
+            update.cancel()
+
+    async def discard_auction(self, guild: discord.Guild, auction_id: int) -> None:
+        """Remove an auction whose thread or message is gone, giving back what it held."""
+        async with self.get_bid_lock(guild.id, auction_id):
+            auction_data = await self.store.refresh(guild.id, auction_id)
+            while auction_data is not None and not await self.store.remove(guild.id, auction_id, auction_data.get("version", 0)):
+                auction_data = await self.store.refresh(guild.id, auction_id)
+        if auction_data is not None:
+            await self.escrow.refund(guild, auction_data)
+        await self.clean_up_auction(guild, auction_id)
+
+    def get_metrics(self):
+        core = self.bot.get_cog("NcogsCore")
+        return core.metrics if core is not None and core.metrics.enabled else None
 
     async def close_auction(self, auction_message: discord.Message, auction_id: int, force_close = False) -> None:
-        guild_config = self.config.guild(auction_message.guild)
-        auction_data = await self.get_auction_data(guild_config, auction_id)
-        use_bank = await guild_config.use_bank()
+        metrics = self.get_metrics()
+        if metrics is None:
+            return await self._close_auction(auction_message, auction_id, force_close)
+        with metrics.timer("serverauctions.close_auction"):
+            await self._close_auction(auction_message, auction_id, force_close, metrics)
+
+    async def _close_auction(self, auction_message: discord.Message, auction_id: int, force_close = False, metrics = None) -> None:
+        guild = auction_message.guild
+        await self.escrow.load(guild, self.store)
+        # Taking the bid lock lets an in-flight bid finish before the record goes away.
+        async with self.get_bid_lock(guild.id, auction_id):
+            if self.store.get(guild.id, auction_id) is None:
+                return
+            # With a shared backend only the process holding the lease closes the auction.
+            if not await self.backend.acquire_lease(guild.id, auction_id, self.instance_id, CLOSE_LEASE_TTL):
+                self.store.forget(guild.id, auction_id)
+                await self.clean_up_auction(guild, auction_id)
+                return
+            # Other processes may have taken bids since this one read the auction, so close the stored copy.
+            # The delete only matches that version; a bid landing first means reading it again.
+            auction_data = await self.store.refresh(guild.id, auction_id)
+            while auction_data is not None and not await self.store.remove(guild.id, auction_id, auction_data.get("version", 0)):
+                auction_data = await self.store.refresh(guild.id, auction_id)
+            if auction_data is None:
+                await self.clean_up_auction(guild, auction_id)
+                return
+            await self.clean_up_auction(guild, auction_id)
+        if metrics is not None:
+            metrics.incr("serverauctions.auctions_removed" if force_close else "serverauctions.auctions_closed")
+        paid = None
+        if auction_data["current_bidder"]:
+            if force_close or not await self.config.guild(guild).use_bank():
+                await self.escrow.refund(guild, auction_data)
+            else:
+                paid = await self.escrow.settle(guild, auction_data)
+        try:
+            await self.archive.append(guild.id, auction_data, removed=force_close, unpaid=paid is False)
+        except Exception:
+            self.log.exception(f"Failed to archive auction #{auction_id} in guild {guild.id}.")
+
+        if force_close:
+            await auction_message.edit(content=f"# `#{auction_id}` was removed.", embed=None)
+            return
 
-        embed = auction_message.embeds[0]
+        embed = auction_embed(auction_data)
         embed.clear_fields()
         embed.title = f"~~{embed.title}~~ - Closed"
         embed.color = discord.Colour.red()
-        guild = auction_message.guild
         host = guild.get_member(auction_data["host_id"]) or await guild.fetch_member(auction_data["host_id"])
         bidder = None
 
@@ -123,30 +347,19 @@ class ServerAuctions(commands.Cog):
             bidder = guild.get_member(auction_data["current_bidder"]) or await guild.fetch_member(auction_data["current_bidder"])
             embed.add_field(name="Sold out to", value=f"{bidder.display_name}", inline=False)
             embed.add_field(name="Final Bid", value=f'{auction_data["current_bid"]}', inline=False)
-            if use_bank:
-                await bank.deposit_credits(host, auction_data["current_bid"])
         else:
             embed.add_field(name="Final bid", value="No bids were placed.", inline=False)
 
-        if force_close:
-            await auction_message.edit(content=f"# `#{auction_id}` was removed.", embed=None)
-            await self.clean_up_auction(guild_config, auction_id)
-            return
-        else:
-            await auction_message.edit(embed=embed)
-            await auction_message.channel.edit(archived=True)
-            await auction_message.channel.send(f"#{auction_data['auction_id']} has been closed.")
+        await auction_message.edit(embed=embed)
+        await auction_message.channel.edit(archived=True)
+        await auction_message.channel.send(f"#{auction_data['auction_id']} has been closed.")
+        if paid is False:
+            await auction_message.channel.send(f"The winning bid of **{auction_data['current_bid']}** could not be paid.")
 
-        await self.try_dm(host, f"-# Your auction [#{auction_data['auction_id']}]({auction_message.jump_url}) has been closed.")
+        self.notifier.notify(host, f"-# Your auction [#{auction_data['auction_id']}]({auction_message.jump_url}) has been closed.")
         if bidder:
-            await self.try_dm(bidder, f"-# Auction [#{auction_data['auction_id']}]({auction_message.jump_url}) solded out to you.")
-        await self.clean_up_auction(guild_config, auction_id)
-
+            self.notifier.notify(bidder, f"-# Auction [#{auction_data['auction_id']}]({auction_message.jump_url}) solded out to you.")
 
-    def auction_initializing_check(ctx: commands.Context):
-        if ctx.cog.initializing_auctions:
-            return False
-        return True
 
     @commands.group(aliases=["auc"], invoke_without_command=True)
     @commands.bot_has_permissions(manage_threads=True, manage_messages=True)
@@ -175,8 +388,10 @@ class ServerAuctions(commands.Cog):
             "quick_sold": None,
             "current_bid": None,
             "current_bidder": None,
+            "held": 0,
             "end_timestamp": None,
-            "min_bid" : 1
+            "min_bid" : 1,
+            "bid_count": 0
         }
         await ctx.message.delete()
         embed = discord.Embed(title=f"#???", description="...", color=discord.Color.green())
@@ -189,73 +404,113 @@ class ServerAuctions(commands.Cog):
             await ctx.send("you need to be an auctioneer to create auction.")
 
     @auction.command()
-    @commands.check(auction_initializing_check)
     @commands.cooldown(1, 5, commands.BucketType.user)  
     async def bid(self, ctx: commands.Context, amount: int):
         """Place a bid on an auction.(used in the active auction thread)"""
+        metrics = self.get_metrics()
+        if metrics is None:
+            return await self.place_bid(ctx, amount)
+        with metrics.timer("serverauctions.bid"):
+            await self.place_bid(ctx, amount, metrics)
+
+    async def place_bid(self, ctx: commands.Context, amount: int, metrics = None):
         if len(str(amount)) > 1008:
             await ctx.send(f"too big..")
             return
         guild_config = self.config.guild(ctx.guild)
-        use_bank = await guild_config.use_bank()  
-        if use_bank:
-            bal = await bank.get_balance(ctx.author)
-            if bal < amount:
-                await ctx.send(f"You do not have enough balance to place this bid. Your current balance is **{bal}**.")
-                return
-
-        active_auction = await self.get_auction_data(guild_config=guild_config, thread_id=ctx.channel.id)
-
-        if not active_auction:
+        use_bank = await guild_config.use_bank()
+        await self.escrow.load(ctx.guild, self.store)
+        active_auction = self.store.get_by_thread(ctx.channel.id)
+        if active_auction is None:
+            # The auction may have been started by another process sharing the backend.
+            await self.store.reload(ctx.guild.id)
+            active_auction = self.store.get_by_thread(ctx.channel.id)
+        auction_message = None
+        if active_auction:
+            auction_message = await self.fetch_auction_message(ctx.guild, active_auction["auction_id"])
+
+        if not active_auction or not auction_message:
             await ctx.send("No active auction found in this channel (thread).")
             return
 
-        previous_bidder = None
-        if active_auction["current_bidder"]:
-            previous_bidder = ctx.guild.get_member(active_auction["current_bidder"]) or await ctx.guild.fetch_member(active_auction["current_bidder"])
-        current_bid = active_auction["current_bid"]
+        auction_id = active_auction["auction_id"]
+        # Bids on one auction run one at a time so validation and bank moves see the latest bid.
+        async with self.get_bid_lock(ctx.guild.id, auction_id):
+            for _ in range(BID_ATTEMPTS):
+                previous = self.store.get(ctx.guild.id, auction_id)
+                if previous is None:
+                    await ctx.send("This auction has already ended.")
+                    return
+                current_bid = previous["current_bid"]
+                if (current_bid is not None and amount <= current_bid) or amount < previous["min_bid"]:
+                    await ctx.send(f"Can't do that. Current bid is **{current_bid}**.")
+                    return
+
+                # Raising your own bid only pays in the difference.
+                owed = self.escrow.owed(previous, ctx.author.id, amount) if use_bank else 0
+                if owed:
+                    bal = await bank.get_balance(ctx.author)
+                    try:
+                        if bal < owed:
+                            raise ValueError
+                        await bank.withdraw_credits(ctx.author, owed)
+                    except ValueError:
+                        await ctx.send(f"You do not have enough balance to place this bid. Your current balance is **{bal}**.")
+                        return
+
+                previous_bidder = None
+                if previous["current_bidder"]:
+                    previous_bidder = ctx.guild.get_member(previous["current_bidder"]) or await ctx.guild.fetch_member(previous["current_bidder"])
+
+                # The bid only becomes visible once the backend has taken it.
+                active_auction = dict(previous)
+                own_held = previous.get("held", 0) if previous["current_bidder"] == ctx.author.id else 0
+                active_auction["held"] = own_held + owed
+                active_auction["current_bid"] = amount
+                active_auction["current_bidder"] = ctx.author.id
+                active_auction["bid_count"] = previous.get("bid_count", 0) + 1
+
+                now = datetime.now(timezone.utc).timestamp()
+                remaining_time = active_auction["end_timestamp"] - now
+                extended = remaining_time <= 60
+                if extended:
+                    active_auction["end_timestamp"] = active_auction["end_timestamp"] + 60
+
+                try:
+                    saved = await self.store.save(ctx.guild.id, active_auction)
+                except Exception:
+                    if owed:
+                        await bank.deposit_credits(ctx.author, owed)
+                    raise
+                if saved:
+                    break
+                if owed:
+                    await bank.deposit_credits(ctx.author, owed)
+                # Another process bid on or closed the auction since it was read here; check against its copy.
+                await self.store.refresh(ctx.guild.id, auction_id)
+            else:
+                await ctx.send("This auction is busy, try again.")
+                return
 
-        if (current_bid is not None and amount <= current_bid) or amount < active_auction["min_bid"]:
-            await ctx.send(f"Can't do that. Current bid is **{current_bid}**.")
-            return
-        if use_bank:
-            await bank.withdraw_credits(ctx.author, amount)
-            # Refund the previous bidder if they exist
-            if previous_bidder and current_bid:
-                await bank.deposit_credits(previous_bidder, current_bid)
-
-        active_auction["current_bid"] = amount
-        active_auction["current_bidder"] = ctx.author.id
-
-        auction_message = self.get_cached_auction_message(active_auction["auction_id"]) 
-        await ctx.send(f"Your bid of {active_auction['current_bid']} has been placed.")
-
-        embed = auction_message.embeds[0]
-
-        now = datetime.now(timezone.utc).timestamp()
-        remaining_time = active_auction["end_timestamp"] - now
-        if remaining_time <= 60:
-            new_end_time = active_auction["end_timestamp"] + 60
-            active_auction["end_timestamp"] = active_auction["end_timestamp"] + 60
-            embed.set_field_at(0, name="Time Remaining", value=f"<t:{int(new_end_time)}:R>", inline=False)
-            if active_auction["auction_id"] in self.auction_tasks:
-                self.auction_tasks[active_auction["auction_id"]].cancel()
-                del self.auction_tasks[active_auction["auction_id"]]
-            task = asyncio.create_task(self.schedule_auction_end(auction_message, active_auction))
-            self.auction_tasks[active_auction["auction_id"]] = task
-
-        await self.update_auction_data(guild_config=guild_config, auction_data=active_auction)
+            # The overwritten leader gets their credits back only now that the new bid is stored.
+            if previous["current_bidder"] != ctx.author.id:
+                await self.escrow.refund(ctx.guild, previous)
+            if extended:
+                self.schedule_auction_end(ctx.guild.id, active_auction)
+        if metrics is not None:
+            metrics.incr("serverauctions.bids_placed")
+
+        await ctx.send(f"Your bid of {amount} has been placed.")
 
         if active_auction["quick_sold"] is not None and amount >= active_auction["quick_sold"]:
-            await self.close_auction(auction_message, active_auction["auction_id"])
+            await self.close_auction(auction_message, auction_id)
             return
 
-        embed.set_field_at(3, name="Current Bid", value=f"{active_auction['current_bid']}", inline=False)
-        await auction_message.edit(embed=embed)
-        
+        self.request_embed_update(ctx.guild.id, auction_id)
+
         if previous_bidder:
-            if previous_bidder.id != active_auction["current_bidder"]:
-                await self.try_dm(previous_bidder, f"-# You have been outbid in [#{active_auction['auction_id']}]({auction_message.jump_url})")
+            if previous_bidder.id != ctx.author.id:
+                self.notifier.notify(previous_bidder, f"-# You have been outbid in [#{auction_id}]({auction_message.jump_url})", merge=True)
 
     @auction.command()
     @commands.is_owner()
@@ -296,9 +551,8 @@ class ServerAuctions(commands.Cog):
     @auction.command()
     async def list(self, ctx: commands.Context):
         """List all active auctions."""
-        guild_config = self.config.guild(ctx.guild)
-        auctions = await guild_config.auctions()
-        
+        auctions = await self.store.load(ctx.guild.id)
+
         if not auctions:
             await ctx.send("There are no active auctions in this server.")
             return
@@ -309,6 +563,55 @@ class ServerAuctions(commands.Cog):
         auction_message = ", ".join(auction_messages)
         await ctx.send(auction_message)
 
+    @auction.command()
+    async def history(self, ctx: commands.Context, member: discord.Member = None):
+        """Browse closed auctions, optionally only those a member hosted or won."""
+        await ArchivePages(ctx, self.archive, member).start()
+
+    @auction.command()
+    async def stats(self, ctx: commands.Context, member: discord.Member = None):
+        """Show totals for closed auctions, or for a member's hosted and won auctions."""
+        stats = await self.archive.stats(ctx.guild.id, member.id if member else None)
+        if not member and not stats["auctions"]:
+            await ctx.send("No closed auctions recorded yet.")
+            return
+
+        embed = discord.Embed(
+            title=f"Auction stats - {member.display_name}" if member else "Auction stats",
+            color=discord.Color.green()
+        )
+        embed.add_field(name="Auctions" if not member else "Hosted", value=f"{stats['auctions']} ({stats['sold']} sold)")
+        embed.add_field(name="Total bids", value=f"{stats['bids'] or 0}")
+        embed.add_field(name="Volume", value=f"{stats['volume'] or 0}")
+        embed.add_field(name="Highest sale", value=f"{stats['highest'] or 0}")
+        embed.add_field(name="Average sale", value=f"{round(stats['average'] or 0, 2)}")
+        if stats["duration"] is not None:
+            embed.add_field(name="Average duration", value=f"{int(stats['duration'] // 60)} minutes")
+        if member:
+            won = await self.archive.winner_stats(ctx.guild.id, member.id)
+            embed.add_field(name="Won", value=f"{won['won']} (spent {won['spent'] or 0})")
+        await ctx.send(embed=embed)
+
+    @auction.command(name="backend")
+    @commands.is_owner()
+    async def set_backend(self, ctx: commands.Context, backend: str, path: str = None):
+        """
+        Choose where live auctions are stored: `config` or `sqlite`.
+
+        `sqlite` lets several bot processes share auctions; give them all the same `path`.
+        Switching back to `config` moves the live auctions out of that file, so switch
+        every process sharing it. Takes effect after the cog is reloaded.
+        """
+        backend = backend.lower()
+        if backend not in ("config", "sqlite"):
+            await ctx.send("Backend must be `config` or `sqlite`.")
+            return
+        await self.config.backend.set(backend)
+        if backend == "sqlite":
+            # Kept when switching back to `config`, so the next load can find the auctions left in it.
+            await self.config.backend_path.set(path)
+        await ctx.send(f"Auction backend set to **{backend}**. Reload the cog to apply it.")
+
     @auction.command()
     @commands.is_owner() 
     async def togglebank(self, ctx: commands.Context):
@@ -322,21 +625,21 @@ class ServerAuctions(commands.Cog):
 
     @auction.command()
     @commands.is_owner() 
-    @commands.check(auction_initializing_check)
     async def forceremove(self, ctx: commands.Context, auction_id: int):
         """Removes an auction."""
-        if not auction_id in self.auction_messages:
+        await self.store.load(ctx.guild.id)
+        auction_message = await self.fetch_auction_message(ctx.guild, auction_id)
+        if auction_message is None:
             await ctx.send(f"No auction found `#{auction_id}`.")
             return
-        auction_message = self.get_cached_auction_message(auction_id)
         await self.close_auction(auction_message, auction_id, force_close=True)
         await ctx.send(f"Auction `#{auction_id}` remove.\n{auction_message.jump_url}")
 
     @commands.Cog.listener()
     async def on_message_delete(self, message: discord.Message):
-        for auction_id, cached_message in list(self.auction_messages.items()):
-            if cached_message.id == message.id:
-                guild_config = self.config.guild(message.guild)
-                await self.clean_up_auction(guild_config, auction_id)
-                self.log.info(f"Auction #{auction_id} has been removed due to its message being deleted in guild: {message.guild.name} (ID: {message.guild.id}).")
-                break
+        key = self.store.key_by_message(message.id)
+        if key is None:
+            return
+        _, auction_id = key
+        await self.discard_auction(message.guild, auction_id)
+        self.log.info(f"Auction #{auction_id} has been removed due to its message being deleted in guild: {message.guild.name} (ID: {message.guild.id}).")
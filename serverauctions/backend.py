@@ -0,0 +1,308 @@
+import json
+import time
+import asyncio
+import sqlite3
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from redbot.core import Config
+
+class AuctionBackend(ABC):
+    """
+    Where live auction records, their deadlines, auction ids and close leases are kept.
+
+    Everything a second bot process could race on goes through here: ids are
+    allocated atomically, every write of a record is checked against the
+    version it was read at, and an auction is only closed by the process
+    holding its lease.
+    """
+    async def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def load_all(self) -> Dict[int, List[dict]]:
+        ...
+
+    @abstractmethod
+    async def load_guild(self, guild_id: int) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def load(self, guild_id: int, auction_id: int) -> Optional[dict]:
+        """Read one auction as it is stored now, or None if it is gone."""
+
+    @abstractmethod
+    async def save(self, guild_id: int, record: dict) -> bool:
+        """
+        Write a record and bump its `version`.
+
+        Fails and leaves the record untouched if the stored copy is no longer the
+        version the record was read at, including when it has been removed.
+        """
+
+    @abstractmethod
+    async def remove(self, guild_id: int, auction_id: int, version: Optional[int] = None) -> bool:
+        """Delete an auction and its lease. With `version`, only if it is still stored at that version."""
+
+    @abstractmethod
+    async def upcoming(self, until: float) -> List[Tuple[int, int, float]]:
+        """`(guild_id, auction_id, end_timestamp)` for every live auction ending by `until`."""
+
+    @abstractmethod
+    async def next_auction_id(self, guild_id: int) -> int:
+        ...
+
+    @abstractmethod
+    async def seed_auction_id(self, guild_id: int, last_id: int) -> None:
+        """Make sure ids handed out later are above `last_id`."""
+
+    @abstractmethod
+    async def acquire_lease(self, guild_id: int, auction_id: int, owner: str, ttl: float) -> bool:
+        """Take or renew the lease on a live auction. False if it is gone or another owner holds it."""
+
+class ConfigBackend(AuctionBackend):
+    """
+    Keeps auctions in Red's Config. Only safe for a single bot process.
+
+    Versions and deadlines are tracked in memory, which is exact as long as this
+    process is the only writer. Records stored before versioning count as version 1,
+    so only a record that was never saved can be written at version 0.
+    """
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.id_lock = asyncio.Lock()
+        self.leases: Dict[Tuple[int, int], Tuple[str, float]] = {}
+        self.versions: Dict[Tuple[int, int], int] = {}
+        self.deadlines: Dict[Tuple[int, int], float] = {}
+
+    def _track(self, guild_id: int, record: dict) -> None:
+        key = (guild_id, record["auction_id"])
+        self.versions.setdefault(key, record.setdefault("version", 1))
+        if record.get("end_timestamp") is not None:
+            self.deadlines[key] = record["end_timestamp"]
+
+    async def load_all(self) -> Dict[int, List[dict]]:
+        guilds = {}
+        for guild_id, data in (await self.config.all_guilds()).items():
+            if data.get("auctions"):
+                guilds[guild_id] = await self.load_guild(guild_id)
+            else:
+                guilds[guild_id] = list(data.get("auction_records", {}).values())
+                for record in guilds[guild_id]:
+                    self._track(guild_id, record)
+        return guilds
+
+    async def load_guild(self, guild_id: int) -> List[dict]:
+        """Read a guild's auctions, moving any legacy `auctions` list over."""
+        guild_config = self.config.guild_from_id(guild_id)
+        records = await guild_config.auction_records()
+        legacy = await guild_config.auctions()
+        if legacy:
+            for auction in legacy:
+                records[str(auction["auction_id"])] = auction
+            await guild_config.auction_records.set(records)
+            await guild_config.auctions.clear()
+        for record in records.values():
+            self._track(guild_id, record)
+        return list(records.values())
+
+    async def load(self, guild_id: int, auction_id: int) -> Optional[dict]:
+        record = await self.config.guild_from_id(guild_id).auction_records.get_raw(str(auction_id), default=None)
+        if record is not None:
+            self._track(guild_id, record)
+        return record
+
+    async def save(self, guild_id: int, record: dict) -> bool:
+        key = (guild_id, record["auction_id"])
+        version = record.get("version", 0)
+        # Checked and bumped before awaiting, so two saves of one version can't both pass.
+        if self.versions.get(key, 0) != version:
+            return False
+        self.versions[key] = record["version"] = version + 1
+        if record.get("end_timestamp") is not None:
+            self.deadlines[key] = record["end_timestamp"]
+        await self.config.guild_from_id(guild_id).auction_records.set_raw(str(record["auction_id"]), value=record)
+        return True
+
+    async def remove(self, guild_id: int, auction_id: int, version: Optional[int] = None) -> bool:
+        key = (guild_id, auction_id)
+        if version is not None and self.versions.get(key, 0) != version:
+            return False
+        # Stale copies are at least version 1, so once forgotten they can't be written back.
+        self.versions.pop(key, None)
+        self.deadlines.pop(key, None)
+        self.leases.pop(key, None)
+        await self.config.guild_from_id(guild_id).auction_records.clear_raw(str(auction_id))
+        return True
+
+    async def upcoming(self, until: float) -> List[Tuple[int, int, float]]:
+        return [(guild_id, auction_id, end) for (guild_id, auction_id), end in self.deadlines.items() if end <= until]
+
+    async def next_auction_id(self, guild_id: int) -> int:
+        async with self.id_lock:
+            guild_config = self.config.guild_from_id(guild_id)
+            auction_id = await guild_config.auction_count() + 1
+            await guild_config.auction_count.set(auction_id)
+        return auction_id
+
+    async def seed_auction_id(self, guild_id: int, last_id: int) -> None:
+        async with self.id_lock:
+            guild_config = self.config.guild_from_id(guild_id)
+            if await guild_config.auction_count() < last_id:
+                await guild_config.auction_count.set(last_id)
+
+    async def acquire_lease(self, guild_id: int, auction_id: int, owner: str, ttl: float) -> bool:
+        now = time.time()
+        holder = self.leases.get((guild_id, auction_id))
+        if holder is not None and holder[0] != owner and holder[1] > now:
+            return False
+        self.leases[(guild_id, auction_id)] = (owner, now + ttl)
+        return True
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS auctions (
+    guild_id INTEGER NOT NULL,
+    auction_id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    end_timestamp REAL,
+    PRIMARY KEY (guild_id, auction_id)
+);
+CREATE TABLE IF NOT EXISTS auction_ids (
+    guild_id INTEGER PRIMARY KEY,
+    last_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    guild_id INTEGER NOT NULL,
+    auction_id INTEGER NOT NULL,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (guild_id, auction_id)
+);
+"""
+
+class SQLiteBackend(AuctionBackend):
+    """
+    Keeps auctions in a SQLite file that several bot processes on one machine can share.
+
+    Id allocation, leases and versioned writes are single statements, so SQLite's
+    write lock makes them atomic across processes.
+    """
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.conn: Optional[sqlite3.Connection] = None
+        self.lock = asyncio.Lock()
+
+    async def open(self) -> None:
+        def _open():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            # Files created before records were versioned lack these columns.
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(auctions)")}
+            if "version" not in columns:
+                conn.execute("ALTER TABLE auctions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            if "end_timestamp" not in columns:
+                conn.execute("ALTER TABLE auctions ADD COLUMN end_timestamp REAL")
+                conn.execute("UPDATE auctions SET end_timestamp = json_extract(data, '$.end_timestamp')")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_auctions_end ON auctions (end_timestamp)")
+            return conn
+        self.conn = await asyncio.to_thread(_open)
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    async def _run(self, query: str, params: tuple = ()) -> List[tuple]:
+        async with self.lock:
+            return await asyncio.to_thread(lambda: self.conn.execute(query, params).fetchall())
+
+    async def load_all(self) -> Dict[int, List[dict]]:
+        guilds = {}
+        for guild_id, data in await self._run("SELECT guild_id, data FROM auctions"):
+            guilds.setdefault(guild_id, []).append(json.loads(data))
+        return guilds
+
+    async def load_guild(self, guild_id: int) -> List[dict]:
+        rows = await self._run("SELECT data FROM auctions WHERE guild_id = ?", (guild_id,))
+        return [json.loads(data) for data, in rows]
+
+    async def load(self, guild_id: int, auction_id: int) -> Optional[dict]:
+        rows = await self._run("SELECT data FROM auctions WHERE guild_id = ? AND auction_id = ?", (guild_id, auction_id))
+        return json.loads(rows[0][0]) if rows else None
+
+    async def save(self, guild_id: int, record: dict) -> bool:
+        version = record.get("version", 0)
+        record["version"] = version + 1
+        params = (json.dumps(record), version + 1, record.get("end_timestamp"))
+        if version == 0:
+            rows = await self._run(
+                # Rows from before versioning sit at version 0 and are updated like new ones.
+                "INSERT INTO auctions (data, version, end_timestamp, guild_id, auction_id) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (guild_id, auction_id) DO UPDATE SET data = excluded.data, version = excluded.version, "
+                "end_timestamp = excluded.end_timestamp WHERE auctions.version = 0 RETURNING version",
+                (*params, guild_id, record["auction_id"]),
+            )
+        else:
+            rows = await self._run(
+                "UPDATE auctions SET data = ?, version = ?, end_timestamp = ? "
+                "WHERE guild_id = ? AND auction_id = ? AND version = ? RETURNING version",
+                (*params, guild_id, record["auction_id"], version),
+            )
+        if not rows:
+            record["version"] = version
+        return bool(rows)
+
+    async def remove(self, guild_id: int, auction_id: int, version: Optional[int] = None) -> bool:
+        def _remove():
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                rows = self.conn.execute(
+                    "DELETE FROM auctions WHERE guild_id = ? AND auction_id = ? AND (? IS NULL OR version = ?) "
+                    "RETURNING auction_id",
+                    (guild_id, auction_id, version, version),
+                ).fetchall()
+                if rows:
+                    self.conn.execute("DELETE FROM leases WHERE guild_id = ? AND auction_id = ?", (guild_id, auction_id))
+                return bool(rows)
+        async with self.lock:
+            return await asyncio.to_thread(_remove)
+
+    async def upcoming(self, until: float) -> List[Tuple[int, int, float]]:
+        return await self._run(
+            "SELECT guild_id, auction_id, end_timestamp FROM auctions WHERE end_timestamp <= ?", (until,)
+        )
+
+    async def next_auction_id(self, guild_id: int) -> int:
+        rows = await self._run(
+            "INSERT INTO auction_ids (guild_id, last_id) VALUES (?, 1) "
+            "ON CONFLICT (guild_id) DO UPDATE SET last_id = last_id + 1 RETURNING last_id",
+            (guild_id,),
+        )
+        return rows[0][0]
+
+    async def last_auction_ids(self) -> List[Tuple[int, int]]:
+        """`(guild_id, last_id)` for every guild that was handed an id."""
+        return await self._run("SELECT guild_id, last_id FROM auction_ids")
+
+    async def seed_auction_id(self, guild_id: int, last_id: int) -> None:
+        await self._run(
+            "INSERT INTO auction_ids (guild_id, last_id) VALUES (?, ?) "
+            "ON CONFLICT (guild_id) DO UPDATE SET last_id = MAX(last_id, excluded.last_id)",
+            (guild_id, last_id),
+        )
+
+    async def acquire_lease(self, guild_id: int, auction_id: int, owner: str, ttl: float) -> bool:
+        now = time.time()
+        rows = await self._run(
+            "INSERT INTO leases (guild_id, auction_id, owner, expires) "
+            "SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM auctions WHERE guild_id = ? AND auction_id = ?) "
+            "ON CONFLICT (guild_id, auction_id) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE leases.owner = excluded.owner OR leases.expires < ? RETURNING owner",
+            (guild_id, auction_id, owner, now + ttl, guild_id, auction_id, now),
+        )
+        return bool(rows)
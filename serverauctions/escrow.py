@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+import discord
+from redbot.core import Config, bank, errors
+
+from .store import AuctionStore
+
+log = logging.getLogger('red.ncogs.auction.escrow')
+
+class EscrowLedger:
+    """
+    Moves the credits auctions hold for their leading bidders.
+
+    An auction record's `held` is what was already withdrawn from its
+    `current_bidder`. Money only moves when the leader changes (the new leader
+    pays in, the old one is refunded), when the leader raises their own bid (by
+    the difference), and once at close to pay the host. Because `held` is saved
+    with the record, every process sharing the backend sees the same holds.
+
+    Older versions kept holds in each guild's `escrow` mapping; they are moved
+    onto the records the first time a guild is loaded.
+    """
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.loaded: Set[int] = set()
+        self.load_locks: Dict[int, asyncio.Lock] = {}
+
+    async def load(self, guild: discord.Guild, store: AuctionStore) -> None:
+        """Move a guild's old holds onto its auctions, once. Must run before any bid or close in the guild."""
+        if guild.id in self.loaded:
+            return
+        async with self.load_locks.setdefault(guild.id, asyncio.Lock()):
+            if guild.id in self.loaded:
+                return
+            await self._migrate(guild, store)
+            self.loaded.add(guild.id)
+
+    async def _migrate(self, guild: discord.Guild, store: AuctionStore) -> None:
+        guild_config = self.config.guild_from_id(guild.id)
+        if await guild_config.escrow_migrated():
+            return
+        records = {record["auction_id"]: record for record in await store.load(guild.id)}
+        holds = await guild_config.escrow()
+        done = True
+        # Each hold is cleared as soon as it is settled, so an interrupted run carries on where it stopped.
+        for auction_id, hold in holds.items():
+            record = records.get(int(auction_id))
+            if record is not None and record["current_bidder"] == hold["holder"]:
+                if "held" not in record and not await store.save(guild.id, dict(record, held=hold["amount"])):
+                    done = False
+                    continue
+            elif not await self.pay(guild, hold["holder"], hold["amount"]):
+                done = False
+                continue
+            await guild_config.escrow.clear_raw(auction_id)
+        if await guild_config.use_bank():
+            # Leading bids from before holds were tracked had their full amount withdrawn.
+            for record in records.values():
+                if record["current_bidder"] and "held" not in record and str(record["auction_id"]) not in holds:
+                    if not await store.save(guild.id, dict(record, held=record["current_bid"])):
+                        done = False
+        if done:
+            await guild_config.escrow_migrated.set(True)
+        else:
+            log.warning(f"Some escrow holds in guild {guild.id} could not be moved yet, retrying on the next load.")
+
+    @staticmethod
+    def owed(record: dict, bidder_id: int, amount: int) -> int:
+        """What `bidder_id` still has to pay in for an auction to hold `amount` for them."""
+        if record["current_bidder"] == bidder_id:
+            return amount - record.get("held", 0)
+        return amount
+
+    async def _member(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        member = guild.get_member(user_id)
+        if member is None:
+            try:
+                member = await guild.fetch_member(user_id)
+            except discord.HTTPException:
+                return None
+        return member
+
+    async def pay(self, guild: discord.Guild, user_id: int, amount: int) -> bool:
+        """Deposit `amount` to a member. False if they left or can't hold that much."""
+        member = await self._member(guild, user_id)
+        if member is None:
+            log.warning(f"Could not pay {amount} to user {user_id} in guild {guild.id}, member not found.")
+            return False
+        try:
+            await bank.deposit_credits(member, amount)
+        except (ValueError, errors.BalanceTooHigh) as e:
+            log.warning(f"Could not pay {amount} to user {user_id} in guild {guild.id}: {e}")
+            return False
+        return True
+
+    async def refund(self, guild: discord.Guild, record: dict) -> None:
+        """Give what an auction holds back to its leader."""
+        if record["current_bidder"] and record.get("held"):
+            await self.pay(guild, record["current_bidder"], record["held"])
+
+    async def settle(self, guild: discord.Guild, record: dict) -> bool:
+        """
+        Pay the winning bid to the host in one deposit.
+
+        Whatever the auction doesn't hold yet, from bids placed before it held
+        credits, is withdrawn from the winner first. Returns False, with the
+        winner refunded, if the host couldn't be paid.
+        """
+        amount = record["current_bid"]
+        held = record.get("held", 0)
+        if held < amount:
+            winner = await self._member(guild, record["current_bidder"])
+            try:
+                if winner is None:
+                    raise ValueError("member not found")
+                await bank.withdraw_credits(winner, amount - held)
+            except ValueError as e:
+                log.warning(f"Winner of auction #{record['auction_id']} in guild {guild.id} can't pay {amount}: {e}")
+                await self.refund(guild, record)
+                return False
+        if not await self.pay(guild, record["host_id"], amount):
+            await self.pay(guild, record["current_bidder"], amount)
+            return False
+        return True
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+import discord
+
+log = logging.getLogger('red.ncogs.auction.notify')
+
+DM_RATE = 5
+MERGE_WINDOW = 10
+DMS_CLOSED_TTL = 3600
+
+class DMNotifier:
+    """
+    Sends auction DMs from a background queue.
+
+    Sends are spaced to at most `rate` per second across all users. Mergeable
+    notices to the same user are held for `merge_window` seconds and sent as a
+    single DM. Users whose DMs are closed are skipped for `closed_ttl` seconds.
+    """
+    def __init__(self, rate: float = DM_RATE, merge_window: float = MERGE_WINDOW, closed_ttl: float = DMS_CLOSED_TTL) -> None:
+        self.interval = 1 / rate if rate else 0
+        self.merge_window = merge_window
+        self.closed_ttl = closed_ttl
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.merging: Dict[int, dict] = {}
+        self.dms_closed: Dict[int, float] = {}
+        self.next_send = 0.0
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def _is_closed(self, user_id: int) -> bool:
+        expires = self.dms_closed.get(user_id)
+        if expires is None:
+            return False
+        if expires < asyncio.get_running_loop().time():
+            del self.dms_closed[user_id]
+            return False
+        return True
+
+    def notify(self, user: discord.User, content: str, merge: bool = False) -> None:
+        """Queue a DM. With `merge`, notices sent to the same user close together go out as one."""
+        if self._is_closed(user.id):
+            return
+        if not merge:
+            self.queue.put_nowait({"user": user, "lines": [content]})
+            return
+        pending = self.merging.get(user.id)
+        if pending is not None:
+            if content not in pending["lines"]:
+                pending["lines"].append(content)
+            return
+        self.merging[user.id] = {"user": user, "lines": [content]}
+        asyncio.get_running_loop().call_later(self.merge_window, self._release, user.id)
+
+    def _release(self, user_id: int) -> None:
+        pending = self.merging.pop(user_id, None)
+        if pending is not None:
+            self.queue.put_nowait(pending)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.queue.get()
+            try:
+                user = item["user"]
+                if self._is_closed(user.id):
+                    continue
+                delay = self.next_send - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.next_send = max(self.next_send, loop.time()) + self.interval
+                await self._send(user, "\n".join(item["lines"]))
+            finally:
+                self.queue.task_done()
+
+    async def _send(self, user: discord.User, content: str) -> None:
+        try:
+            await user.send(content)
+        except discord.Forbidden:
+            self.dms_closed[user.id] = asyncio.get_running_loop().time() + self.closed_ttl
+        except discord.HTTPException as e:
+            log.debug(f"Failed to DM user {user.id}: {e}")
@@ -0,0 +1,88 @@
+import heapq
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+log = logging.getLogger('red.ncogs.auction.scheduler')
+
+class AuctionScheduler:
+    """
+    Runs auction endings from a single task.
+
+    Deadlines live in a min-heap of `(end_timestamp, key)`. Rescheduling a key just
+    pushes a new entry; the old one is skipped when it reaches the top because it no
+    longer matches `deadlines[key]`.
+    """
+    def __init__(self, callback: Callable[[Hashable], Awaitable[None]]) -> None:
+        self.callback = callback
+        self.heap: List[Tuple[float, Hashable]] = []
+        self.deadlines: Dict[Hashable, float] = {}
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.firing: Set[asyncio.Task] = set()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.deadlines
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.heap.clear()
+        self.deadlines.clear()
+
+    def schedule(self, key: Hashable, end_timestamp: float) -> None:
+        self.deadlines[key] = end_timestamp
+        heapq.heappush(self.heap, (end_timestamp, key))
+        if len(self.heap) > 2 * len(self.deadlines) + 64:
+            self._compact()
+        # Only an earlier deadline changes how long the loop has to sleep.
+        if self.heap[0][1] == key:
+            self.wakeup.set()
+
+    def cancel(self, key: Hashable) -> None:
+        self.deadlines.pop(key, None)
+
+    def _compact(self) -> None:
+        self.heap = [(end, key) for end, key in self.heap if self.deadlines.get(key) == end]
+        heapq.heapify(self.heap)
+
+    def _pop_stale(self) -> None:
+        while self.heap and self.deadlines.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+    async def _run(self) -> None:
+        while True:
+            self._pop_stale()
+            if self.heap:
+                timeout = self.heap[0][0] - datetime.now(timezone.utc).timestamp()
+            else:
+                timeout = None
+
+            if timeout is None or timeout > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, key = heapq.heappop(self.heap)
+            del self.deadlines[key]
+            task = asyncio.create_task(self._fire(key))
+            self.firing.add(task)
+            task.add_done_callback(self.firing.discard)
+
+    async def _fire(self, key: Hashable) -> None:
+        try:
+            await self.callback(key)
+        except Exception:
+            log.exception(f"Failed to end auction {key}.")
@@ -0,0 +1,110 @@
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+from .backend import AuctionBackend
+
+class AuctionStore:
+    """
+    In-memory auction records indexed by auction, thread and message id.
+
+    Reads never touch the backend. Writes go through to it one record at a time
+    and only land if the backend still has the version that was read; `refresh`
+    picks up changes made by other processes. Records handed out are the indexed
+    ones, so changes are made on a copy that replaces them once `save` succeeds.
+    """
+    def __init__(self, backend: AuctionBackend) -> None:
+        self.backend = backend
+        self.records: Dict[Tuple[int, int], dict] = {}
+        self.by_thread: Dict[int, Tuple[int, int]] = {}
+        self.by_message: Dict[int, Tuple[int, int]] = {}
+        self.loaded: Set[int] = set()
+        self.load_locks: Dict[int, asyncio.Lock] = {}
+
+    def _index(self, guild_id: int, record: dict, keep_existing: bool = False) -> None:
+        key = (guild_id, record["auction_id"])
+        # Records already in memory may be newer than what was just read from the backend.
+        if keep_existing and key in self.records:
+            return
+        self.records[key] = record
+        if record["thread_id"]:
+            self.by_thread[record["thread_id"]] = key
+        if record["message_id"]:
+            self.by_message[record["message_id"]] = key
+
+    async def load(self, guild_id: int) -> List[dict]:
+        """Load a guild's auctions once."""
+        if guild_id in self.loaded:
+            return self.guild_auctions(guild_id)
+        async with self.load_locks.setdefault(guild_id, asyncio.Lock()):
+            if guild_id in self.loaded:
+                return self.guild_auctions(guild_id)
+            for record in await self.backend.load_guild(guild_id):
+                self._index(guild_id, record, keep_existing=True)
+            self.loaded.add(guild_id)
+        return self.guild_auctions(guild_id)
+
+    async def reload(self, guild_id: int) -> None:
+        """Pick up auctions other processes added to a guild since it was loaded."""
+        for record in await self.backend.load_guild(guild_id):
+            self._index(guild_id, record, keep_existing=True)
+
+    async def load_all(self) -> None:
+        """Load every guild's auctions in one backend read."""
+        for guild_id, records in (await self.backend.load_all()).items():
+            if guild_id in self.loaded:
+                continue
+            for record in records:
+                self._index(guild_id, record, keep_existing=True)
+            self.loaded.add(guild_id)
+
+    def get(self, guild_id: int, auction_id: int) -> Optional[dict]:
+        return self.records.get((guild_id, auction_id))
+
+    def get_by_thread(self, thread_id: int) -> Optional[dict]:
+        key = self.by_thread.get(thread_id)
+        return self.records.get(key) if key else None
+
+    def key_by_message(self, message_id: int) -> Optional[Tuple[int, int]]:
+        return self.by_message.get(message_id)
+
+    def guild_auctions(self, guild_id: int) -> List[dict]:
+        return [record for (g_id, _), record in self.records.items() if g_id == guild_id]
+
+    async def refresh(self, guild_id: int, auction_id: int) -> Optional[dict]:
+        """Replace a record with the backend's current copy. Drops it if it is gone there."""
+        record = await self.backend.load(guild_id, auction_id)
+        if record is None:
+            self.forget(guild_id, auction_id)
+            return None
+        self._index(guild_id, record)
+        return record
+
+    async def save(self, guild_id: int, record: dict) -> bool:
+        """Write a record through. False if it changed or was removed in the backend since it was read."""
+        if not await self.backend.save(guild_id, record):
+            return False
+        self._index(guild_id, record)
+        return True
+
+    def forget(self, guild_id: int, auction_id: int) -> Optional[dict]:
+        """Drop a record from memory only, e.g. when another process is closing it."""
+        record = self.records.pop((guild_id, auction_id), None)
+        if record is not None:
+            self.by_thread.pop(record["thread_id"], None)
+            self.by_message.pop(record["message_id"], None)
+        return record
+
+    async def remove(self, guild_id: int, auction_id: int, version: Optional[int] = None) -> bool:
+        """
+        Drop a record here and in the backend.
+
+        With `version` the backend copy is only deleted if it is still at that version.
+        Without it, records this process doesn't hold are left alone in the backend.
+        """
+        if version is not None:
+            if not await self.backend.remove(guild_id, auction_id, version):
+                return False
+            self.forget(guild_id, auction_id)
+            return True
+        if self.forget(guild_id, auction_id) is None:
+            return False
+        return await self.backend.remove(guild_id, auction_id)
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
 import discord
-import asyncio
 from redbot.core import commands
 from datetime import datetime, timezone, timedelta
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from .auction import ServerAuctions
+    from .archive import AuctionArchive
+
+def auction_embed(auction_data: dict) -> discord.Embed:
+    """Build an open auction's embed from its record."""
+    auction_id = auction_data["auction_id"] or "???"
+    embed = discord.Embed(title=f"#{auction_id} - {auction_data['name']}", description=auction_data["description"], color=discord.Color.green())
+    embed.add_field(name="Time Remaining", value=f"<t:{int(auction_data['end_timestamp'])}:R>", inline=False)
+    embed.add_field(name="Quick Sold Amount", value=auction_data["quick_sold"], inline=False)
+    embed.add_field(name="Min Bid", value=auction_data["min_bid"], inline=False)
+    embed.add_field(name="Current Bid", value=f'{auction_data["current_bid"]}', inline=False)
+    embed.set_footer(text=f"Host: {auction_data['host_name']}")
+    return embed
 
 class AuctionSetup(discord.ui.View):
     def __init__(self, ctx: commands.Context, embed: discord.Embed, auction_data: dict, auc: ServerAuctions):
@@ -36,18 +47,13 @@ class AuctionSetup(discord.ui.View):
         self.modal_data["min_bid"] = auc_modal.minimum_bid
         
         end_time = datetime.now(timezone.utc) + timedelta(minutes=auc_modal.time_period)
-        end_timestamp = int(end_time.timestamp())
-        self.embed.clear_fields()
-        self.embed.title = f"#??? - {auc_modal.name}"
-        self.embed.description = auc_modal.description
-        self.embed.add_field(name="Time Remaining", value=f"<t:{end_timestamp}:R>", inline=False)
-        self.auction_data["end_timestamp"] = end_timestamp
-        self.embed.add_field(name="Quick Sold Amount", value=auc_modal.quick_sold, inline=False)
+        self.auction_data["name"] = auc_modal.name
+        self.auction_data["description"] = auc_modal.description
+        self.auction_data["host_name"] = interaction.user.display_name
+        self.auction_data["end_timestamp"] = int(end_time.timestamp())
         self.auction_data["quick_sold"] = auc_modal.quick_sold
-        self.embed.add_field(name="Min Bid", value=auc_modal.minimum_bid, inline=False)
         self.auction_data["min_bid"] = auc_modal.minimum_bid
-        self.embed.add_field(name="Current Bid", value=f'{self.auction_data["current_bid"]}', inline=False)
-        self.embed.set_footer(text=f"Host: {interaction.user.display_name}")
+        self.embed = auction_embed(self.auction_data)
         await interaction.message.edit(embed=self.embed, view=self)
         self.children[1].disabled = False
         await interaction.message.edit(embed=self.embed, view=self) 
@@ -57,24 +63,18 @@ class AuctionSetup(discord.ui.View):
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.message.delete()
        
-        guild_config = self.auc.config.guild(self.ctx.guild)
-        current_auction_count = await guild_config.auction_count()
-        await guild_config.auction_count.set(current_auction_count + 1)
-        self.auction_data["auction_id"] = current_auction_count + 1
-        self.embed.title = self.embed.title.replace('???', str(self.auction_data['auction_id']))
+        self.auction_data["auction_id"] = await self.auc.backend.next_auction_id(self.ctx.guild.id)
+        self.auction_data["created_at"] = int(datetime.now(timezone.utc).timestamp())
+        self.embed = auction_embed(self.auction_data)
         auc_thread = await self.ctx.channel.create_thread(name=self.embed.title, type=discord.ChannelType.public_thread)
         auction_message = await auc_thread.send(embed=self.embed)
         await auction_message.pin()
 
-        self.auc.cache_auction_message(self.auction_data["auction_id"], auction_message)
-
         self.auction_data["thread_id"] = auc_thread.id
         self.auction_data["message_id"] = auction_message.id
-        async with guild_config.auctions() as auctions:
-            auctions.append(self.auction_data)
+        await self.auc.store.save(self.ctx.guild.id, self.auction_data)
 
-        task = asyncio.create_task(self.auc.schedule_auction_end(auction_message, self.auction_data))
-        self.auc.auction_tasks[self.auction_data["auction_id"]] = task
+        self.auc.schedule_auction_end(self.ctx.guild.id, self.auction_data)
 
     @discord.ui.button(label='Cancel', style=discord.ButtonStyle.red)
     async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -166,3 +166,69 @@ class AuctionInfo(discord.ui.Modal):
             return
         await interaction.response.defer()
 
+
+ARCHIVE_PAGE_SIZE = 10
+
+class ArchivePages(discord.ui.View):
+    def __init__(self, ctx: commands.Context, archive: AuctionArchive, member: discord.Member = None):
+        super().__init__(timeout=120)
+        self.ctx = ctx
+        self.archive = archive
+        self.member = member
+        # Row id each shown page started before, so going back never re-reads older pages.
+        self.cursors = [None]
+        self.rows = []
+
+    async def fetch(self):
+        member_id = self.member.id if self.member else None
+        rows = await self.archive.page(self.ctx.guild.id, member_id, self.cursors[-1], limit=ARCHIVE_PAGE_SIZE + 1)
+        self.rows = rows[:ARCHIVE_PAGE_SIZE]
+        self.previous.disabled = len(self.cursors) == 1
+        self.next.disabled = len(rows) <= ARCHIVE_PAGE_SIZE
+
+    def make_embed(self) -> discord.Embed:
+        title = f"Auction history - {self.member.display_name}" if self.member else "Auction history"
+        lines = []
+        for row in self.rows:
+            if row["removed"]:
+                result = "removed"
+            elif row["final_bid"] is not None:
+                winner = f"<@{row['winner_id']}>" if row["winner_id"] is not None else "a deleted user"
+                result = f"**{row['final_bid']}** to {winner}"
+                if row["unpaid"]:
+                    result += " (unpaid)"
+            else:
+                result = "no bids"
+            host = f"<@{row['host_id']}>" if row["host_id"] is not None else "a deleted user"
+            lines.append(f"`#{row['auction_id']}` {row['name'] or ''} - {result} (host {host}) <t:{row['closed_at']}:d>")
+        embed = discord.Embed(title=title, description="\n".join(lines), color=discord.Color.green())
+        embed.set_footer(text=f"Page {len(self.cursors)}")
+        return embed
+
+    async def start(self):
+        await self.fetch()
+        if not self.rows:
+            await self.ctx.send("No closed auctions recorded yet.")
+            return
+        await self.ctx.send(embed=self.make_embed(), view=self)
+
+    @discord.ui.button(label='Previous', style=discord.ButtonStyle.grey)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursors.pop()
+        await self.fetch()
+        await interaction.response.edit_message(embed=self.make_embed(), view=self)
+
+    @discord.ui.button(label='Next', style=discord.ButtonStyle.grey)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursors.append(self.rows[-1]["id"])
+        await self.fetch()
+        await interaction.response.edit_message(embed=self.make_embed(), view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user != self.ctx.author:
+            await interaction.response.send_message("You cannot use this button :(", ephemeral=True)
+            return False
+        return True
+
+    async def on_timeout(self):
+        self.stop()